@@ -0,0 +1,347 @@
+import os
+import sys
+import json
+import argparse
+
+from resource_pack_generator import INPUT_DIR, OUTPUT_DIR, TEMPLATE_DIR, TRIM_TYPES, SETTINGS_TEMPLATE, BuildCache, BuildContext, BuildError, index_inputs, resolve_asset, texture_ever_exists, get_template_archive, collect_model_references, collect_multipart_values, multipart_apply, invalid_multipart_operators, variant_unsupported
+
+"""
+This script validates the input assets without building anything, so it is cheap enough to run on every push.
+
+It indexes the 'input' directory (or the merged input layers, see --input) once with the generator's own
+index_inputs and runs the generator's lookups against that index, without copying, generating or zipping anything:
+- blockstates: variant/multipart structure, property sets (every variant names every property exactly once),
+  variant models (or the textures a model would be generated from) and vanilla item ids
+- items: vanilla item ids, models (explicit, inlined or the item/block model or texture they default to),
+  tints and automatic trims
+- models: parents and textures
+
+An input directory that does not exist is reported as an error (the build fails on it too) and nothing else is checked.
+Every problem is reported with the file and the key inside it, the script exits with 1 if there are any errors.
+
+Usage:
+    python pack_check.py [--input DIR [--input OVERLAY_DIR ...]] [--json]
+"""
+
+class InputIndex:
+    """The generator's merged index of the input layers, along with the vanilla item ids known from the templates."""
+
+    def __init__(self, inputDir, templateDir=TEMPLATE_DIR):
+        # the build context is only used for its index and lookups (neither writes anything), no build phase is run
+        self.ctx = BuildContext(inputDir, OUTPUT_DIR, SETTINGS_TEMPLATE, BuildCache(), templateDir, logWarnings=False)
+        index_inputs(self.ctx)
+        self.files = self.ctx.assets # namespace -> path relative to the namespace -> (file path, mtime, size)
+
+        archive = get_template_archive(self.ctx, os.path.join(templateDir, "items", "items.zip"))
+        self.vanillaItems = {f"minecraft:{name[:-5]}" for name in archive if name.endswith(".json")} if archive is not None else None
+
+    def has(self, namespace, path):
+        return resolve_asset(self.ctx, namespace, path) is not None
+
+    def path(self, namespace, relFile):
+        return resolve_asset(self.ctx, namespace, relFile)[0]
+
+    def model_exists(self, modelPath):
+        namespace, path = split_id(modelPath)
+        return namespace == "minecraft" or self.has(namespace, f"models/{path}.json")
+
+    def texture_exists(self, texturePath):
+        namespace, path = split_id(texturePath)
+        return namespace == "minecraft" or self.has(namespace, f"textures/{path}.png")
+
+    def texture_ever_exists(self, texturePath):
+        return texture_ever_exists(self.ctx, texturePath)
+
+    def vanilla_exists(self, vanillaItem):
+        return self.vanillaItems is None or vanillaItem in self.vanillaItems
+
+def split_id(resourceId):
+    return resourceId.split(':', 1) if ':' in resourceId else ('minecraft', resourceId)
+
+class Checker:
+    def __init__(self, index):
+        self.index = index
+        self.diagnostics = []
+
+    def report(self, severity, file, key, message):
+        self.diagnostics.append({
+            "severity": severity,
+            "file": file.replace("\\", "/"),
+            "key": key,
+            "message": message
+        })
+
+    def error(self, file, key, message):
+        self.report("error", file, key, message)
+
+    def warning(self, file, key, message):
+        self.report("warning", file, key, message)
+
+    def read_json(self, file):
+        try:
+            with open(file, 'rb') as f:
+                return json.loads(f.read())
+        except ValueError as e:
+            self.error(file, None, f"Invalid json: {e}")
+            return None
+
+    def check_vanilla(self, file, vanillaItem):
+        vanillaItem = vanillaItem if ":" in vanillaItem else f"minecraft:{vanillaItem}"
+        if not self.index.vanilla_exists(vanillaItem):
+            self.error(file, "vanilla", f"Unknown vanilla item {vanillaItem}.")
+
+    def check_model_reference(self, file, key, modelPath):
+        if not isinstance(modelPath, str):
+            self.error(file, key, f"Model reference {modelPath} is not a string.")
+        elif not self.index.model_exists(modelPath):
+            self.error(file, key, f"Model {modelPath} does not exist.")
+
+    def check_variant_model(self, file, key, modelPath):
+        # the generator falls back to a cube_all model when only a texture with the model's name exists
+        if not isinstance(modelPath, str):
+            self.error(file, key, f"Model reference {modelPath} is not a string.")
+        elif not self.index.model_exists(modelPath) and not self.index.texture_ever_exists(modelPath):
+            self.error(file, key, f"Model {modelPath} does not exist and there is no texture to generate it from.")
+
+    def check_multipart_when(self, file, key, when):
+        # the generator skips a part whose 'OR'/'AND' is not a list of conditions (objects)
+        invalid = invalid_multipart_operators(when, key)
+        for operatorKey in invalid:
+            operator = operatorKey.split('.')[-1]
+            self.error(file, operatorKey, f"'{operator}' should be a list of conditions (objects), the part will be skipped.")
+        return not invalid
+
+    def check_model(self, namespace, relFile):
+        file = self.index.path(namespace, relFile)
+        model = self.read_json(file)
+        if model is None:
+            return
+        if not isinstance(model, dict):
+            self.error(file, None, "Model is not a json object.")
+            return
+
+        if "parent" in model:
+            self.check_model_reference(file, "parent", model["parent"])
+        textures = model.get("textures", {})
+        if not isinstance(textures, dict):
+            self.error(file, "textures", "Textures should be an object of texture variables.")
+            return
+        for name, texturePath in textures.items():
+            if not isinstance(texturePath, str):
+                self.error(file, f"textures.{name}", f"Texture reference {texturePath} is not a string.")
+            elif not texturePath.startswith("#") and not self.index.texture_exists(texturePath):
+                self.error(file, f"textures.{name}", f"Texture {texturePath} does not exist.")
+
+    def check_blockstate(self, namespace, relFile):
+        file = self.index.path(namespace, relFile)
+        if not relFile.endswith(".json"):
+            self.warning(file, None, "Block file is not a json file and will be skipped.")
+            return
+        blockData = self.read_json(file)
+        if blockData is None:
+            return
+        if not isinstance(blockData, dict):
+            self.error(file, None, "Block file is not a json object.")
+            return
+
+        blockPath = relFile[len("blocks/"):-5]
+        blockName = blockPath.split('/')[-1]
+        if "vanilla" in blockData:
+            if not isinstance(blockData["vanilla"], str):
+                self.error(file, "vanilla", "Vanilla item id should be a string.")
+            else:
+                self.check_vanilla(file, blockData["vanilla"])
+
+        if "multipart" in blockData and "variants" in blockData:
+            self.error(file, None, "Block file contains both multipart and variants definitions.")
+            return
+        if "multipart" in blockData and (not isinstance(blockData["multipart"], list) or len(blockData["multipart"]) == 0):
+            self.error(file, "multipart", "Multipart definitions should be a non-empty list.")
+            return
+        if "variants" in blockData and (not isinstance(blockData["variants"], dict) or len(blockData["variants"]) == 0):
+            self.error(file, "variants", "Variants should be a non-empty object.")
+            return
+        multipart = blockData.get("multipart", [])
+        variants = blockData.get("variants", {})
+
+        needsProperties = len(variants) > 1 or any(isinstance(part, dict) and "when" in part for part in multipart)
+        if needsProperties and not isinstance(blockData.get("properties"), list):
+            self.error(file, "properties", "Block file does not contain a list of possible properties.")
+            return
+        allPropertyKeys = blockData.get("properties", [])
+
+        if multipart:
+            for i, part in enumerate(multipart):
+                key = f"multipart[{i}]"
+                if isinstance(part, dict) and isinstance(part.get("apply"), list) and len(part["apply"]) > 1:
+                    self.warning(file, f"{key}.apply", "Weighted models are not supported, only the first will be used.")
+                apply = multipart_apply(part)
+                if apply is None:
+                    self.error(file, f"{key}.apply", "Part does not contain a model.")
+                    continue
+                if variant_unsupported(apply):
+                    self.error(file, f"{key}.apply", "Part contains uvlock or weight, which are not supported, it will be skipped.")
+                    continue
+                self.check_variant_model(file, f"{key}.apply.model", apply["model"])
+
+                when = part.get("when")
+                if when is not None and not isinstance(when, dict):
+                    self.error(file, f"{key}.when", "Condition should be an object of properties, 'OR' or 'AND'.")
+                    continue
+                if when is not None and not self.check_multipart_when(file, f"{key}.when", when):
+                    continue
+                partValues = {}
+                collect_multipart_values(when, partValues)
+                for property in partValues:
+                    if property not in allPropertyKeys:
+                        self.error(file, f"{key}.when.{property}", f"Property {property} is not in the block's property list.")
+            return
+
+        if not variants:
+            found = self.index.has(namespace, f"models/block/{blockName}.json") or self.index.has(namespace, f"models/block/{blockPath}.json")
+            if not found and not self.index.texture_ever_exists(f"{namespace}:block/{blockName}"):
+                self.error(file, None, f"Block does not contain any variants and no model (block/{blockName}) or texture to generate a model could be found for it.")
+            return
+
+        seen = {}
+        for name, variant in variants.items():
+            key = f"variants.{name}"
+            if not isinstance(variant, dict) or "model" not in variant:
+                self.error(file, key, "Variant does not contain a model.")
+                continue
+            if variant_unsupported(variant):
+                self.error(file, key, "Variant contains uvlock or weight, which are not supported, it will be skipped.")
+                continue
+            self.check_variant_model(file, f"{key}.model", variant["model"])
+
+            properties = {}
+            for prop in name.split(','):
+                if '=' not in prop:
+                    if name != "":
+                        self.error(file, key, f"Variant contains invalid property {prop} (should be key=value).")
+                    continue
+                property, value = prop.split('=', 1)
+                if property not in allPropertyKeys:
+                    self.error(file, key, f"Variant contains property {property} which is not in the block's property list.")
+                properties[property] = value
+
+            if len(variants) > 1:
+                missing = [property for property in allPropertyKeys if property not in properties]
+                if missing:
+                    self.error(file, key, f"Variant does not set properties {missing}, it will be skipped.")
+                combination = tuple(properties.get(property) for property in allPropertyKeys)
+                if combination in seen:
+                    self.warning(file, key, f"Variant has the same properties as {seen[combination]}, only one of them will be used.")
+                seen.setdefault(combination, name)
+
+    def check_item(self, namespace, relFile):
+        file = self.index.path(namespace, relFile)
+        if not relFile.endswith(".json"):
+            self.warning(file, None, "Item file is not a json file and will be skipped.")
+            return
+        itemData = self.read_json(file)
+        if itemData is None:
+            return
+        if not isinstance(itemData, dict):
+            self.error(file, None, "Item file is not a json object.")
+            return
+
+        itemPath = relFile[len("items/"):-5]
+        itemName = itemPath.split('/')[-1]
+        if not isinstance(itemData.get("vanilla"), str):
+            self.error(file, "vanilla", "Item file does not contain a valid vanilla item id.")
+        else:
+            self.check_vanilla(file, itemData["vanilla"])
+
+        if "oversized_in_gui" in itemData and itemData["oversized_in_gui"] != True:
+            self.error(file, "oversized_in_gui", "Invalid oversized_in_gui value (should only ever be 'true').")
+
+        if "fallback" in itemData:
+            modelPaths = []
+            collect_model_references(itemData["fallback"], modelPaths)
+            for modelPath in modelPaths:
+                self.check_model_reference(file, "fallback", modelPath)
+
+        modelType = "minecraft:model"
+        modelPath = None
+        if "model" in itemData:
+            model = itemData["model"]
+            if isinstance(model, dict):
+                modelType = model.get("type")
+                modelPaths = []
+                collect_model_references(model, modelPaths)
+                for path in modelPaths:
+                    self.check_model_reference(file, "model", path)
+                modelPath = model.get("model") if modelType == "minecraft:model" else None
+            elif isinstance(model, str):
+                self.check_model_reference(file, "model", model)
+                modelPath = model
+            else:
+                self.error(file, "model", "Invalid model value (should be a full definition or inlined model reference).")
+                return
+        else:
+            for candidate in [f"item/{itemName}", f"item/{itemPath}", f"block/{itemName}", f"block/{itemPath}"]:
+                if self.index.has(namespace, f"models/{candidate}.json"):
+                    modelPath = f"{namespace}:{candidate}"
+                    break
+            if modelPath is None and not self.index.texture_ever_exists(f"{namespace}:item/{itemName}") and not self.index.texture_ever_exists(f"{namespace}:block/{itemName}"):
+                self.error(file, None, f"Item does not contain a model and no model (item/{itemName}, block/{itemName}) or texture to generate a model could be found for it.")
+                return
+
+        if "tints" in itemData:
+            if not isinstance(itemData["tints"], list) or len(itemData["tints"]) == 0:
+                self.error(file, "tints", "Invalid tints value (should be a non-empty list).")
+            elif modelType != "minecraft:model":
+                self.error(file, "tints", "Item contains tints but its model type is not 'minecraft:model'.")
+
+        if "create_trims" in itemData:
+            if itemData["create_trims"] not in TRIM_TYPES:
+                self.error(file, "create_trims", f"Invalid trimmable type {itemData['create_trims']} (must be one of {TRIM_TYPES}).")
+            elif modelType != "minecraft:model":
+                self.error(file, "create_trims", "Item contains create_trims but its model type is not 'minecraft:model'.")
+            elif modelPath is not None and self.index.model_exists(modelPath) and split_id(modelPath)[0] != "minecraft":
+                trimNamespace, trimPath = split_id(modelPath)
+                model = self.read_json(self.index.path(trimNamespace, f"models/{trimPath}.json"))
+                if isinstance(model, dict) and model.get("parent") != "item/generated":
+                    self.error(file, "create_trims", f"For automatic trims, item model {modelPath} must have parent 'item/generated'.")
+
+def check(inputDir=INPUT_DIR, templateDir=TEMPLATE_DIR):
+    """Validates inputDir (or a list of input layers, lowest precedence first) without writing anything and returns the list of diagnostics."""
+    try:
+        index = InputIndex(inputDir, templateDir)
+    except BuildError as e:
+        # nothing can be checked (or built) without all of the input layers
+        checker = Checker(None)
+        for path in e.paths:
+            checker.error(path, None, "Input directory does not exist.")
+        return checker.diagnostics
+    checker = Checker(index)
+    if checker.index.vanillaItems is None:
+        checker.warning(os.path.join(templateDir, "items", "items.zip"), None, "Template items.zip does not exist, vanilla item ids will not be checked.")
+
+    for namespace, files in sorted(checker.index.files.items()):
+        for relFile in sorted(files):
+            if relFile.startswith("blocks/"):
+                checker.check_blockstate(namespace, relFile)
+            elif relFile.startswith("items/"):
+                checker.check_item(namespace, relFile)
+            elif relFile.startswith("models/") and relFile.endswith(".json"):
+                checker.check_model(namespace, relFile)
+    return checker.diagnostics
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(description="Validates the input assets without building the pack.")
+    argParser.add_argument("--input", action="append", metavar="DIR", help=f"an input directory (default '{INPUT_DIR}'), can be repeated to layer overlays on top of it, later ones take precedence")
+    argParser.add_argument("--json", action="store_true", help="print the diagnostics as json")
+    args = argParser.parse_args()
+
+    diagnostics = check(args.input if args.input is not None else INPUT_DIR)
+    errors = sum(1 for diagnostic in diagnostics if diagnostic["severity"] == "error")
+    if args.json:
+        print(json.dumps(diagnostics, indent=4))
+    else:
+        for diagnostic in diagnostics:
+            location = f"{diagnostic['file']} ({diagnostic['key']})" if diagnostic["key"] is not None else diagnostic["file"]
+            print(f"{diagnostic['severity'].capitalize()}: {location}: {diagnostic['message']}")
+        print(f"{errors} errors, {len(diagnostics) - errors} warnings.")
+    sys.exit(1 if errors > 0 else 0)
@@ -0,0 +1,237 @@
+import os
+import json
+import zipfile
+import argparse
+
+from resource_pack_generator import OUTPUT_DIR, get_build_name, load_settings
+
+"""
+This script reports what takes up space in a resource pack generated by resource_pack_generator.py.
+
+Every entry of 'output/<name>.zip' is attributed (compressed and uncompressed bytes) to its namespace,
+its asset kind (models, textures, items, ...) and the input file that caused it, using the source map
+the generator writes next to the zip ('output/<name>.sources.json'). Generated models are attributed to
+the blockstate/item json they were generated for, and each case of a vanilla item model definition is
+attributed to the blockstate/item json that added it. The largest entries and the deepest select trees
+are listed as well.
+
+Passing --diff <old zip> compares an older build against the current one instead, listing the entries
+that were added, removed, grown or shrunk with their byte deltas, so pack weight changes can be reviewed.
+
+Usage:
+    python pack_report.py [zip] [--top N] [--json report.json]
+    python pack_report.py --diff old.zip [zip] [--top N] [--json diff.json]
+"""
+
+DEFAULT_TOP = 20
+
+def default_zip_path():
+    return os.path.join(OUTPUT_DIR, f"{get_build_name(load_settings())}.zip")
+
+def load_sources(zipPath):
+    sourcesPath = f"{zipPath[:-4]}.sources.json" if zipPath.endswith(".zip") else f"{zipPath}.sources.json"
+    if not os.path.exists(sourcesPath):
+        print(f"Warning: Source map '{sourcesPath}' does not exist, entries will only be attributed to themselves.")
+        return {"assets": {}, "cases": {}}
+    with open(sourcesPath, 'r') as f:
+        return json.load(f)
+
+def entry_namespace(name):
+    parts = name.split('/')
+    return parts[1] if parts[0] == "assets" and len(parts) > 2 else "(root)"
+
+def entry_kind(name):
+    parts = name.split('/')
+    return parts[2] if parts[0] == "assets" and len(parts) > 3 else "(root)"
+
+def select_depth(model):
+    if isinstance(model, list):
+        return max((select_depth(child) for child in model), default=0)
+    if not isinstance(model, dict):
+        return 0
+    depth = max((select_depth(child) for child in model.values()), default=0)
+    if model.get("type") in ("minecraft:select", "select"):
+        depth += 1
+    return depth
+
+def add_bytes(totals, key, compressed, uncompressed):
+    entry = totals.setdefault(key, {"compressed": 0, "uncompressed": 0, "entries": 0})
+    entry["compressed"] += compressed
+    entry["uncompressed"] += uncompressed
+    entry["entries"] += 1
+
+def sorted_totals(totals):
+    return dict(sorted(totals.items(), key=lambda item: item[1]["compressed"], reverse=True))
+
+def read_entries(zipPath):
+    entries = {}
+    with zipfile.ZipFile(zipPath, 'r') as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            entries[info.filename] = {
+                "compressed": info.compress_size,
+                "uncompressed": info.file_size
+            }
+    return entries
+
+def analyze(zipPath):
+    sources = load_sources(zipPath)
+    assetSources = sources.get("assets", {})
+    caseSources = sources.get("cases", {})
+
+    entries = read_entries(zipPath)
+    byNamespace = {}
+    byKind = {}
+    bySource = {}
+    selectTrees = []
+
+    with zipfile.ZipFile(zipPath, 'r') as zf:
+        for name, sizes in entries.items():
+            compressed, uncompressed = sizes["compressed"], sizes["uncompressed"]
+            add_bytes(byNamespace, entry_namespace(name), compressed, uncompressed)
+            add_bytes(byKind, entry_kind(name), compressed, uncompressed)
+
+            if name in assetSources:
+                add_bytes(bySource, assetSources[name], compressed, uncompressed)
+                continue
+
+            # vanilla item model definitions are shared by many blocks/items, so split them per case
+            cases = []
+            if entry_kind(name) == "items" and name.endswith(".json"):
+                try:
+                    definition = json.loads(zf.read(name))
+                    cases = definition.get("model", {}).get("cases", [])
+                except (ValueError, AttributeError):
+                    print(f"Warning: Item definition {name} could not be parsed, attributing it to itself.")
+
+            parts = name[:-5].split('/', 3)
+            itemCaseSources = caseSources.get(f"{parts[1]}:{parts[3]}", {}) if len(parts) == 4 else {}
+            remaining = uncompressed
+            for case in cases if isinstance(cases, list) else []:
+                if not isinstance(case, dict):
+                    continue
+                key = case.get("when")
+                caseBytes = len(json.dumps(case))
+                source = itemCaseSources.get(key) if isinstance(key, str) else None
+                selectTrees.append({
+                    "when": key,
+                    "entry": name,
+                    "source": source,
+                    "depth": select_depth(case.get("model")),
+                    "uncompressed": caseBytes
+                })
+                if source is None:
+                    continue
+                caseBytes = min(caseBytes, remaining)
+                remaining -= caseBytes
+                add_bytes(bySource, source, round(compressed * caseBytes / uncompressed) if uncompressed else 0, caseBytes)
+            add_bytes(bySource, f"(generated) {name}", round(compressed * remaining / uncompressed) if uncompressed else 0, remaining)
+
+    selectTrees.sort(key=lambda tree: (tree["depth"], tree["uncompressed"]), reverse=True)
+    return {
+        "zip": zipPath,
+        "compressed": sum(sizes["compressed"] for sizes in entries.values()),
+        "uncompressed": sum(sizes["uncompressed"] for sizes in entries.values()),
+        "entries": dict(sorted(entries.items(), key=lambda item: item[1]["compressed"], reverse=True)),
+        "by_namespace": sorted_totals(byNamespace),
+        "by_kind": sorted_totals(byKind),
+        "by_source": sorted_totals(bySource),
+        "select_trees": selectTrees
+    }
+
+def diff(oldZipPath, newZipPath):
+    oldEntries = read_entries(oldZipPath)
+    newEntries = read_entries(newZipPath)
+    changes = {"added": [], "removed": [], "grown": [], "shrunk": []}
+
+    for name in sorted(set(oldEntries) | set(newEntries)):
+        old = oldEntries.get(name, {"compressed": 0, "uncompressed": 0})
+        new = newEntries.get(name, {"compressed": 0, "uncompressed": 0})
+        change = {
+            "entry": name,
+            "compressed_delta": new["compressed"] - old["compressed"],
+            "uncompressed_delta": new["uncompressed"] - old["uncompressed"]
+        }
+        if name not in oldEntries:
+            changes["added"].append(change)
+        elif name not in newEntries:
+            changes["removed"].append(change)
+        elif change["uncompressed_delta"] > 0:
+            changes["grown"].append(change)
+        elif change["uncompressed_delta"] < 0:
+            changes["shrunk"].append(change)
+
+    for kind in changes:
+        changes[kind].sort(key=lambda change: abs(change["compressed_delta"]), reverse=True)
+
+    oldCompressed = sum(sizes["compressed"] for sizes in oldEntries.values())
+    newCompressed = sum(sizes["compressed"] for sizes in newEntries.values())
+    oldUncompressed = sum(sizes["uncompressed"] for sizes in oldEntries.values())
+    newUncompressed = sum(sizes["uncompressed"] for sizes in newEntries.values())
+    return {
+        "old": oldZipPath,
+        "new": newZipPath,
+        "compressed_delta": newCompressed - oldCompressed,
+        "uncompressed_delta": newUncompressed - oldUncompressed,
+        **changes
+    }
+
+def format_bytes(size, signed=False):
+    sign = ("+" if size > 0 else "-" if size < 0 else "") if signed else ("-" if size < 0 else "")
+    size = abs(size)
+    for unit in ["B", "KiB", "MiB"]:
+        if size < 1024 or unit == "MiB":
+            return f"{sign}{size:.0f} {unit}" if unit == "B" else f"{sign}{size:.1f} {unit}"
+        size /= 1024
+
+def print_totals(title, totals, top):
+    print(f"\n{title}:")
+    for key, sizes in list(totals.items())[:top]:
+        print(f"  {format_bytes(sizes['compressed']):>10} {format_bytes(sizes['uncompressed']):>10} {sizes['entries']:>6}  {key}")
+
+def print_report(report, top):
+    print(f"Pack '{report['zip']}': {format_bytes(report['compressed'])} compressed, {format_bytes(report['uncompressed'])} uncompressed, {len(report['entries'])} entries.")
+    print("  (columns: compressed, uncompressed, entries)")
+    print_totals("By namespace", report["by_namespace"], top)
+    print_totals("By asset kind", report["by_kind"], top)
+    print_totals("By source file", report["by_source"], top)
+
+    print("\nLargest entries:")
+    for name, sizes in list(report["entries"].items())[:top]:
+        print(f"  {format_bytes(sizes['compressed']):>10} {format_bytes(sizes['uncompressed']):>10}  {name}")
+
+    print("\nDeepest select trees:")
+    for tree in report["select_trees"][:top]:
+        print(f"  depth {tree['depth']:>2} {format_bytes(tree['uncompressed']):>10}  {tree['when']} in {tree['entry']} ({tree['source'] or 'unknown source'})")
+
+def print_diff(result, top):
+    print(f"Diff '{result['old']}' -> '{result['new']}': {format_bytes(result['compressed_delta'], True)} compressed, {format_bytes(result['uncompressed_delta'], True)} uncompressed.")
+    for kind in ["added", "removed", "grown", "shrunk"]:
+        changes = result[kind]
+        print(f"\n{kind.capitalize()} ({len(changes)}):")
+        for change in changes[:top]:
+            print(f"  {format_bytes(change['compressed_delta'], True):>11} {format_bytes(change['uncompressed_delta'], True):>11}  {change['entry']}")
+        if len(changes) > top:
+            print(f"  ... and {len(changes) - top} more")
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(description="Reports what takes up space in a generated resource pack.")
+    argParser.add_argument("zip", nargs="?", default=None, help="the pack to report on (defaults to output/<name>.zip)")
+    argParser.add_argument("--diff", metavar="OLD_ZIP", help="compare an older build of the pack against this one")
+    argParser.add_argument("--top", type=int, default=DEFAULT_TOP, help=f"how many rows to print per section (default {DEFAULT_TOP})")
+    argParser.add_argument("--json", metavar="PATH", help="also write the full report as json to this path")
+    args = argParser.parse_args()
+
+    zipPath = args.zip if args.zip is not None else default_zip_path()
+    if args.diff is not None:
+        result = diff(args.diff, zipPath)
+        print_diff(result, args.top)
+    else:
+        result = analyze(zipPath)
+        print_report(result, args.top)
+
+    if args.json is not None:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=4)
+        print(f"\nReport written to '{args.json}'.")
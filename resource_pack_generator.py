@@ -1,8 +1,16 @@
 import os
+import sys
 import json
 import copy
+import hashlib
+import itertools
+import time
 import shutil
+import fnmatch
 import zipfile
+import argparse
+import contextlib
+import concurrent.futures
 
 """
 This script generates a pylon resource pack from supplied assets from the 'input' directory.
@@ -24,7 +32,58 @@ This script automates:
     - if it defaults to a provided block model, it will create a new item model that inherits from the block model so that the "fixed" display can be changed, as in block context "fixed" is a placed block, but in item context "fixed" is an item frame
 - blockstate to item model conversion
   - this includes both creating the item model definitions, and creating specific item model variants based on rotations
+  - multipart blockstates are compiled into a composite of one small select per part, so they grow with the number of parts rather than with every combination of property values
+    (the build report's "multipart" section compares each composite's size against the same block written out as variants)
 - merging item model definitions
+
+To validate the input without building (or writing) anything, run pack_check.py instead.
+
+Pass --only <namespace, '<namespace>/<path>' prefix or glob> (repeatable) for a partial build of just
+the matching blockstate/item files and assets, along with the models and textures they reach
+(e.g. --only pylon/blocks/machines/diesel_machines or --only 'pylon/items/*.json'). Partial builds are
+written as '<name>.partial.zip' (and so on) so they never replace a full build, and nothing is
+written at all if the patterns do not match any input file.
+
+Every run also writes a build report ('output/<name>.build.json') with the wall time and
+io counters of each phase, and a source map ('output/<name>.sources.json') recording which
+input file produced each entry of the zip (used by pack_report.py). Pass --profile to write a
+cProfile dump ('output/<name>.prof') or --trace-memory to write the top tracemalloc allocation
+sites ('output/<name>.memory.txt').
+
+The generator can also be imported, nothing is done at import time:
+
+    import resource_pack_generator as generator
+    cache = generator.BuildCache()
+    result = generator.build("input", "output", cache=cache)
+    print(result.outputPath, result.stats["wall_time"], result.warnings)
+
+Passing the same BuildCache to several builds reuses the parsed input models and templates
+(entries are invalidated when their file changes), and only recompiles the blockstate/item files
+whose input file, or any model or texture lookup they made, changed since the last build. The
+other ones replay what they generated last time, and unchanged assets are not copied again.
+
+The input can be split into several layers (e.g. a base pack plus server specific overlays),
+given in order of precedence, lowest first:
+
+    python resource_pack_generator.py --input input --input overlays/survival
+    generator.build(["input", "overlays/survival"], "output", cache=cache)
+
+The layers are merged into a single index, for every asset path (and every root file, like
+pack.mcmeta) the topmost layer that has it wins, and the blockstate, item, model and texture
+lookups all go through that index. settings.json is read from the topmost layer that has one.
+
+By default a single pack containing everything is built. settings.json can instead declare several
+output packs, which are all built from the same compiled assets and written in parallel (name and
+version can then be left out, the build report is named after the first pack):
+
+    "packs": [
+        {"name": "PylonPack", "version": "0.7.1", "include": ["pylon", "rebar", "rebarmobs"]},
+        {"name": "RebarPack", "version": "0.7.1", "include": ["rebar", "rebarmobs/items/*"]}
+    ]
+
+Each include entry is either a namespace or a glob over '<namespace>/<path>' of the input assets.
+A pack gets the included assets, the vanilla item definition cases of the included blockstate/item
+files (along with every model and texture those reach) and atlases for the textures it ends up with.
 """
 
 TRIM_TYPES = [
@@ -58,151 +117,382 @@ TEMPLATE_DIR = "template"
 INPUT_DIR = "input"
 OUTPUT_DIR = "output"
 
-settings = SETTINGS_TEMPLATE.copy()
-settingsPath = os.path.join(INPUT_DIR, "settings.json")
-if os.path.exists(settingsPath):
-    with open(settingsPath, 'r') as f:
-        settings = json.load(f)
-
-logWarnings = True
-deleteTemp = False
-
-tempDir = os.path.join(OUTPUT_DIR, "temp")
-if os.path.exists(tempDir):
-    for root, dirs, files in os.walk(tempDir, topdown=False):
-        for name in files:
-            os.remove(os.path.join(root, name))
-        for name in dirs:
-            os.rmdir(os.path.join(root, name))
-else:
-    os.makedirs(tempDir)
-outputPath = os.path.join(OUTPUT_DIR, f"{settings['name']}.zip")
-
-# unpack template/items/items.zip into template/items
-if os.path.exists(os.path.join(TEMPLATE_DIR, "items", "items.zip")):
-    with zipfile.ZipFile(os.path.join(TEMPLATE_DIR, "items", "items.zip"), 'r') as zf:
-        zf.extractall(os.path.join(TEMPLATE_DIR, "items"))
-else:
-    if logWarnings:
-        print(f"Warning: Template items.zip does not exist. (The generator may not work properly without it.)")
-
-blockModelDefinitions = []
-itemModelDefinitions = {}
+MULTIPART_ENUMERATION_LIMIT = 65536
+
+STAT_COUNTERS = [
+    "files_read",
+    "files_written",
+    "bytes_read",
+    "bytes_written",
+    "stat_calls",
+    "model_cache_hits",
+    "model_cache_misses",
+    "walk_calls",
+    "units_compiled",
+    "units_reused",
+    "copies_skipped"
+]
+
+## Build State
+class BuildCache:
+    """Parsed input models, template archives and compiled blockstate/item files, can be shared between builds in the same process."""
+
+    def __init__(self):
+        self.models = {} # file path -> (mtime, size, model)
+        self.templates = {} # archive path -> (mtime, size, {name: bytes})
+        self.units = {} # '<namespace>/<path>' of a blockstate/item file -> {"stamp", "deps", "effects"} (see compile_unit)
+        self.copied = {} # temp dir -> {arcname: stamp} of the input files copied into it
+
+class BuildError(Exception):
+    """A build that cannot run, raised before anything is written (paths are the inputs at fault, if any)."""
+
+    def __init__(self, message, paths=None):
+        super().__init__(message)
+        self.paths = paths if paths is not None else []
+
+class BuildResult:
+    """What a call to build() produced."""
+
+    def __init__(self, name, version, packs, reportPath, stats, warnings):
+        self.name = name
+        self.version = version
+        self.packs = packs # [{"name", "version", "outputPath", "sourcesPath"}] of every pack written
+        self.outputPath = packs[0]["outputPath"] if packs else None
+        self.sourcesPath = packs[0]["sourcesPath"] if packs else None
+        self.reportPath = reportPath
+        self.stats = stats
+        self.warnings = warnings
+
+class BuildContext:
+    """All of the state of a single build, along with the instrumented io helpers it goes through."""
+
+    def __init__(self, inputDir, outputDir, settings, cache, templateDir=TEMPLATE_DIR, logWarnings=True, deleteTemp=False, only=None):
+        self.inputDirs = [inputDir] if isinstance(inputDir, str) else list(inputDir) # input layers, lowest precedence first
+        self.outputDir = outputDir
+        self.templateDir = templateDir
+        self.settings = settings
+        self.cache = cache
+        self.logWarnings = logWarnings
+        self.deleteTemp = deleteTemp
+        self.only = only # patterns of a partial build (see asset_matches), None for a full build
+        self.onlyCounts = {"blockstates": [0, 0], "items": [0, 0], "assets": [0, 0]} # [matched, total]
+
+        self.tempDir = os.path.join(outputDir, "temp")
+
+        # merged index of the input layers (see index_inputs)
+        self.assets = {} # namespace -> {relPath: (file path, mtime, size)} of the topmost layer that has it
+        self.rootFiles = {} # file name -> (file path, mtime, size)
+        self.textureNames = {} # namespace -> {file name: [paths under textures/]}
+        self.sourceKeys = {} # file path -> '<namespace>/<path>'
+        self.keptFiles = set() # temp files left over from the last build that are still up to date
+        self.copiedFiles = set() # input files copied (or kept) by this build
+
+        self.modelCache = {}
+        self.modelFingerprints = {} # model path -> what it was loaded from (see model_fingerprint)
+        self.unit = None # the blockstate/item file being compiled (see compile_unit)
+        self.blockModelDefinitions = []
+        self.itemModelDefinitions = {}
+        self.itemDefinition = None # (vanilla item, definition) the item being compiled adds its case to
+        self.packMeta = None # the raw pack.mcmeta, rendered per pack
+        self.warnings = []
+        self.packs = get_packs(self, settings)
+
+        # the build report is named after the build, or the first pack if settings.json only declares packs
+        self.name = get_build_name(settings)
+        self.version = settings.get("version", self.packs[0]["version"] if self.packs else "")
+        self.outputSuffix = ".partial" if only is not None else "" # (so a partial build never replaces a full one)
+        self.reportPath = os.path.join(outputDir, f"{self.name}{self.outputSuffix}.build.json")
+
+        # which input file produced each zip entry (and each block/item case, per vanilla item), for pack_report.py and pack filtering
+        self.assetSources = {}
+        self.caseSources = {}
+        self.currentSource = None
+
+        self.stats = {
+            "phases": {},
+            "totals": {counter: 0 for counter in STAT_COUNTERS}
+        }
+        self.currentPhase = None
+
+    def warn(self, message):
+        if self.unit is not None:
+            self.unit["effects"].append(("warn", message))
+        self.warnings.append(message)
+        if self.logWarnings:
+            print(message)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        phaseStats = self.stats["phases"].setdefault(name, {"wall_time": 0.0, **{counter: 0 for counter in STAT_COUNTERS}})
+        self.currentPhase = name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            phaseStats["wall_time"] += time.perf_counter() - started
+            self.currentPhase = None
+
+    def count(self, counter, amount=1):
+        self.stats["totals"][counter] += amount
+        if self.currentPhase is not None:
+            self.stats["phases"][self.currentPhase][counter] += amount
+
+    def path_exists(self, path):
+        self.count("stat_calls")
+        return os.path.exists(path)
+
+    def path_isfile(self, path):
+        self.count("stat_calls")
+        return os.path.isfile(path)
+
+    def path_isdir(self, path):
+        self.count("stat_calls")
+        return os.path.isdir(path)
+
+    def walk(self, path, topdown=True):
+        self.count("walk_calls")
+        return os.walk(path, topdown=topdown)
+
+    def list_files(self, path):
+        files = []
+        for root, dirs, names in self.walk(path):
+            for file in names:
+                relDir = os.path.relpath(root, path)
+                relFile = os.path.join(relDir, file) if relDir != '.' else file
+                files.append(relFile.replace("\\", "/"))
+        return files
+
+    def read_json(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.count("files_read")
+        self.count("bytes_read", len(data))
+        return json.loads(data)
+
+    def read_cached_model(self, stamp):
+        """Reads an indexed input model through the shared cache. (do not mutate the result)"""
+        path, mtime, size = stamp
+        cached = self.cache.models.get(path)
+        if cached is not None and cached[0] == mtime and cached[1] == size:
+            return cached[2]
+        model = self.read_json(path)
+        self.cache.models[path] = (mtime, size, model)
+        return model
+
+    def write_json(self, path, data):
+        self.write_bytes(path, json.dumps(data, indent=None).encode('utf-8'))
+
+    def write_bytes(self, path, contents):
+        with open(path, 'wb') as f:
+            f.write(contents)
+        self.count("files_written")
+        self.count("bytes_written", len(contents))
+
+    def copy_file(self, inputPath, outputPath):
+        shutil.copyfile(inputPath, outputPath)
+        size = os.path.getsize(outputPath)
+        self.count("files_read")
+        self.count("bytes_read", size)
+        self.count("files_written")
+        self.count("bytes_written", size)
+
+def get_packs(ctx, settings):
+    if "packs" not in settings:
+        return [{"name": settings["name"], "version": settings["version"], "include": None}]
+
+    packs = []
+    for pack in settings["packs"]:
+        if not isinstance(pack, dict) or not isinstance(pack.get("name"), str):
+            ctx.warn(f"Warning: Pack {pack} does not contain a valid name, skipping.")
+            continue
+        if any(other["name"] == pack["name"] for other in packs):
+            # (both would be written to the same zip)
+            ctx.warn(f"Warning: Pack {pack['name']} is declared more than once, skipping.")
+            continue
+        include = pack.get("include", None)
+        if include is not None and (not isinstance(include, list) or not all(isinstance(pattern, str) for pattern in include)):
+            ctx.warn(f"Warning: Pack {pack['name']} contains invalid include value (should be a list of namespaces or path globs), skipping.")
+            continue
+        packs.append({
+            "name": pack["name"],
+            "version": pack.get("version", settings.get("version", "")),
+            "include": include
+        })
+    return packs
+
+def get_build_name(settings):
+    # the top-level name, or the first pack's if settings.json only declares packs
+    if "name" in settings:
+        return settings["name"]
+    packs = settings.get("packs")
+    if isinstance(packs, list) and packs and isinstance(packs[0], dict) and isinstance(packs[0].get("name"), str):
+        return packs[0]["name"]
+    return SETTINGS_TEMPLATE["name"]
+
+def load_settings(inputDir=INPUT_DIR):
+    # with several input layers the topmost settings.json wins
+    for layerDir in reversed([inputDir] if isinstance(inputDir, str) else list(inputDir)):
+        settingsPath = os.path.join(layerDir, "settings.json")
+        if os.path.exists(settingsPath):
+            with open(settingsPath, 'r') as f:
+                return json.load(f)
+    return SETTINGS_TEMPLATE.copy()
 
 ## Generator Methods
-def get_template(templatePath):
-    file_path = os.path.join(TEMPLATE_DIR, f"{templatePath}.json")
-    if not os.path.exists(file_path):
-        if logWarnings:
-            print(f"Warning: Template {templatePath} ('{file_path}') does not exist, skipping.")
+def get_template(ctx, templatePath):
+    file_path = os.path.join(ctx.templateDir, f"{templatePath}.json")
+    if ctx.path_exists(file_path):
+        return ctx.read_json(file_path)
+
+    # templates are shipped zipped up as <dir>/<dir>.zip (e.g. template/items/items.zip)
+    templateDir, name = templatePath.rsplit('/', 1) if '/' in templatePath else ('', templatePath)
+    archivePath = os.path.join(ctx.templateDir, templateDir, f"{templateDir.split('/')[-1]}.zip")
+    archive = get_template_archive(ctx, archivePath)
+    if archive is None or f"{name}.json" not in archive:
+        ctx.warn(f"Warning: Template {templatePath} ('{file_path}') does not exist, skipping.")
         return None
-    with open(file_path, 'r') as f:
-        return json.load(f)
+    return json.loads(archive[f"{name}.json"])
 
-def asset_saved(assetPath):
+def get_template_archive(ctx, archivePath):
+    ctx.count("stat_calls")
+    try:
+        stat = os.stat(archivePath)
+    except FileNotFoundError:
+        return None
+    cached = ctx.cache.templates.get(archivePath)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    with zipfile.ZipFile(archivePath, 'r') as zf:
+        archive = {info.filename: zf.read(info) for info in zf.infolist() if not info.is_dir()}
+    ctx.count("files_read")
+    ctx.count("bytes_read", stat.st_size)
+    ctx.cache.templates[archivePath] = (stat.st_mtime_ns, stat.st_size, archive)
+    return archive
+
+def asset_saved(ctx, assetPath):
     namespace, path = assetPath.split(':') if ':' in assetPath else ('minecraft', assetPath)
-    file_path = os.path.join(tempDir, "assets", namespace, path)
-    return os.path.exists(file_path)
+    file_path = os.path.join(ctx.tempDir, "assets", namespace, path)
+    return ctx.path_exists(file_path)
+
+def resolve_asset(ctx, namespace, relPath):
+    # (file path, mtime, size) of the topmost input layer that has the asset, None if none of them do
+    return ctx.assets.get(namespace, {}).get(relPath)
 
-def asset_exists(assetPath):
+def asset_exists(ctx, assetPath):
     namespace, path = assetPath.split(':') if ':' in assetPath else ('minecraft', assetPath)
-    file_path = os.path.join(INPUT_DIR, "assets", namespace, path)
-    if os.path.exists(file_path):
+    if resolve_asset(ctx, namespace, path) is not None:
         return True
 
-    file_path = os.path.join(tempDir, "assets", namespace, path)
-    return os.path.exists(file_path)
+    file_path = os.path.join(ctx.tempDir, "assets", namespace, path)
+    return ctx.path_exists(file_path)
 
-def save_asset(assetPath, data):
-    if asset_saved(assetPath):
+def save_asset(ctx, assetPath, data):
+    # data is either json data or the already encoded contents
+    if ctx.unit is not None:
+        # recorded encoded, as the data may still be changed after it is saved
+        data = data if isinstance(data, bytes) else json.dumps(data, indent=None).encode('utf-8')
+        ctx.unit["effects"].append(("save", assetPath, data))
+    if asset_saved(ctx, assetPath):
         return
 
     namespace, path = assetPath.split(':') if ':' in assetPath else ('minecraft', assetPath)
-    file_path = os.path.join(tempDir, "assets", namespace, path)
+    file_path = os.path.join(ctx.tempDir, "assets", namespace, path)
 
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=None)
+    if isinstance(data, bytes):
+        ctx.write_bytes(file_path, data)
+    else:
+        ctx.write_json(file_path, data)
+    if ctx.currentSource is not None:
+        ctx.assetSources[f"assets/{namespace}/{path}"] = ctx.currentSource
 
-modelCache = {}
-def get_model(modelPath, logWarnings=logWarnings):
+def get_model(ctx, modelPath, logWarnings=True):
     namespace, path = modelPath.split(':') if ':' in modelPath else ('minecraft', modelPath)
-    if modelPath in modelCache:
-        return copy.deepcopy(modelCache[modelPath])
-
-    file_path = os.path.join(INPUT_DIR, "assets", namespace, "models", f"{path}.json")
-    if not os.path.exists(file_path):
-        output_file_path = os.path.join(tempDir, "assets", namespace, "models", f"{path}.json")
-        if os.path.exists(output_file_path):
-            with open(output_file_path, 'r') as f:
-                model = json.load(f)
-                modelCache[modelPath] = model
-                return copy.deepcopy(model)
-
+    if modelPath in ctx.modelCache:
+        ctx.count("model_cache_hits")
+        record_dependency(ctx, "model", modelPath, ctx.modelFingerprints[modelPath])
+        return copy.deepcopy(ctx.modelCache[modelPath])
+    ctx.count("model_cache_misses")
+
+    stamp = resolve_asset(ctx, namespace, f"models/{path}.json")
+    if stamp is None:
+        output_file_path = os.path.join(ctx.tempDir, "assets", namespace, "models", f"{path}.json")
+        if ctx.path_exists(output_file_path):
+            with open(output_file_path, 'rb') as f:
+                data = f.read()
+            ctx.count("files_read")
+            ctx.count("bytes_read", len(data))
+            model = json.loads(data)
+            ctx.modelCache[modelPath] = model
+            ctx.modelFingerprints[modelPath] = ("temp", hashlib.sha1(data).hexdigest())
+            record_dependency(ctx, "model", modelPath, ctx.modelFingerprints[modelPath])
+            return copy.deepcopy(model)
+
+        record_dependency(ctx, "model", modelPath, None)
         if logWarnings:
-            print(f"Warning: model {modelPath} ('{file_path}') does not exist, skipping.")
+            file_path = os.path.join(ctx.inputDirs[-1], "assets", namespace, "models", f"{path}.json")
+            ctx.warn(f"Warning: model {modelPath} ('{file_path}') does not exist, skipping.")
         return None
 
-    with open(file_path, 'r') as f:
-        model = json.load(f)
-        modelCache[modelPath] = model
-        return copy.deepcopy(model)
-        
+    model = ctx.read_cached_model(stamp)
+    ctx.modelCache[modelPath] = model
+    ctx.modelFingerprints[modelPath] = stamp
+    record_dependency(ctx, "model", modelPath, stamp)
+    return copy.deepcopy(model)
 
-def save_model(modelPath, model):
+def save_model(ctx, modelPath, model):
     namespace, path = modelPath.split(':') if ':' in modelPath else ('minecraft', modelPath)
     asset_path = f"{namespace}:models/{path}"
-    save_asset(f"{asset_path}.json", model)
+    save_asset(ctx, f"{asset_path}.json", model)
 
-def texture_ever_exists(texturePath):
+def texture_ever_exists(ctx, texturePath):
     namespace, path = texturePath.split(':') if ':' in texturePath else ('minecraft', texturePath)
     name = path.split('/')[-1] if '/' in path else path
     path = path.rsplit('/', 1)[0] if '/' in path else ''
-    file_path = os.path.join(INPUT_DIR, "assets", namespace, "textures", path)
-    if os.path.exists(os.path.join(file_path, f"{name}.png")):
-        return True
-
-    for _, _, files in os.walk(file_path):
-        if f"{name}.png" in files:
-            return True
-    return False
+    # anywhere under textures/<path>
+    prefix = f"{path}/" if path else ''
+    exists = any(found.startswith(prefix) for found in ctx.textureNames.get(namespace, {}).get(f"{name}.png", []))
+    record_dependency(ctx, "texture_exists", texturePath, exists)
+    return exists
 
-def find_texture(texturePath):
+def find_texture(ctx, texturePath):
     namespace, path = texturePath.split(':') if ':' in texturePath else ('minecraft', texturePath)
     name = path.split('/')[-1] if '/' in path else path
     path = path.rsplit('/', 1)[0] if '/' in path else ''
+    found = None
     # Check the expected location under textures/<path>
-    textures_dir = os.path.join(INPUT_DIR, "assets", namespace, "textures", path)
-    if os.path.exists(os.path.join(textures_dir, f"{name}.png")):
+    rel = f"{path}/{name}" if path else name
+    if resolve_asset(ctx, namespace, f"textures/{rel}.png") is not None:
         # Return resource path relative to the textures folder (no 'textures/' prefix)
-        rel = os.path.join(path, name).replace(os.sep, '/') if path else name
-        return f"{namespace}:{rel}"
-
-    # If not found at the expected location, search the whole textures folder for the file
-    search_root = os.path.join(INPUT_DIR, "assets", namespace, "textures")
-    for root, _, files in os.walk(search_root):
-        if f"{name}.png" in files:
-            rel_path = os.path.relpath(root, search_root)
-            rel = os.path.join(rel_path, name).replace(os.sep, '/') if rel_path != '.' else name
-            return f"{namespace}:{rel}"
-    return None
-
-def save_item_definition(itemPath, itemDef):
+        found = f"{namespace}:{rel}"
+    else:
+        # If not found at the expected location, search the whole textures folder for the file (first in walk order)
+        matches = ctx.textureNames.get(namespace, {}).get(f"{name}.png", [])
+        if matches:
+            found = f"{namespace}:{matches[0][:-4]}"
+    record_dependency(ctx, "find_texture", texturePath, found)
+    return found
+
+def save_item_definition(ctx, itemPath, itemDef):
     namespace, itemId = itemPath.split(':') if ':' in itemPath else ('minecraft', itemPath)
-    save_asset(f"{namespace}:items/{itemId}.json", itemDef)
+    save_asset(ctx, f"{namespace}:items/{itemId}.json", itemDef)
 
-def create_block_model_variant(name, variant, displayType):
-    if "uvlock" in variant or "weight" in variant:
-        if logWarnings:
-            print(f"Warning: Block variant {name} contains uvlock or weight, which are not supported, skipping.")
+def variant_unsupported(variant):
+    # a variant (or the model a multipart part applies) using these is skipped
+    return "uvlock" in variant or "weight" in variant
+
+def create_block_model_variant(ctx, name, variant, displayType):
+    if variant_unsupported(variant):
+        ctx.warn(f"Warning: Block variant {name} contains uvlock or weight, which are not supported, skipping.")
         return None
-    
+
     modelPath = variant["model"]
-    model = get_model(modelPath, False)
+    model = get_model(ctx, modelPath, False)
     if model is None:
         namespace, path = modelPath.split(':') if ':' in modelPath else ('minecraft', modelPath)
-        if texture_ever_exists(f"{namespace}:{path}"):
-            texturePath = find_texture(f"{namespace}:{path}")
+        if texture_ever_exists(ctx, f"{namespace}:{path}"):
+            texturePath = find_texture(ctx, f"{namespace}:{path}")
             modelPath = f"{namespace}:{path}"
             model = {
                 "parent": "block/cube_all",
@@ -216,13 +506,12 @@ def create_block_model_variant(name, variant, displayType):
             }
             if "author" in variant:
                 model["author"] = variant["author"]
-            save_model(modelPath, model)
+            save_model(ctx, modelPath, model)
         else:
-            if logWarnings:
-                print(f"Warning: Block variant {name} root model {modelPath} could not be found, skipping.")
+            ctx.warn(f"Warning: Block variant {name} root model {modelPath} could not be found, skipping.")
             return None
 
-    if "x" in variant or "y" in variant or "z" in variant:        
+    if "x" in variant or "y" in variant or "z" in variant:
         if "x" in variant:
             x_rot = variant["x"] % 360
             modelPath += f"_x{x_rot}"
@@ -233,7 +522,7 @@ def create_block_model_variant(name, variant, displayType):
             z_rot = variant["z"] % 360
             modelPath += f"_z{z_rot}"
 
-        if not get_model(modelPath, False) is None:
+        if not get_model(ctx, modelPath, False) is None:
             return modelPath # already exists
 
         display = model["display"] if "display" in model else {}
@@ -251,424 +540,811 @@ def create_block_model_variant(name, variant, displayType):
         fixed_display["rotation"] = fixed_rotation
         display[displayType] = fixed_display
         model["display"] = display
-        save_model(modelPath, model)
+        save_model(ctx, modelPath, model)
     else:
-        save_model(modelPath, model)
-    
+        save_model(ctx, modelPath, model)
+
 
     return modelPath
-        
-## First copy over all non block/item definitions (as these are only used to generate actual assets, they are not directly assets themselves):
-for namespace in os.listdir(os.path.join(INPUT_DIR, "assets")):
-    namespacePath = os.path.join(INPUT_DIR, "assets", namespace)
-    if not os.path.isdir(namespacePath):
-        continue
-
-    for root, dirs, files in os.walk(namespacePath):
-        for file in files:
-            relDir = os.path.relpath(root, namespacePath)
-            relFile = os.path.join(relDir, file) if relDir != '.' else file
-            relFile = relFile.replace("\\", "/")
+
+def build_select_from_cases(ctx, cases_list, propertyKeys, index=0):
+    if index >= len(propertyKeys):
+        return None
+
+    key = propertyKeys[index]
+    select = {
+        "type": "minecraft:select",
+        "property": "custom_model_data",
+        "index": index + 1, # plus one because the first index is the block model id itself
+        "cases": []
+    }
+
+    groups = {}
+    for case in cases_list:
+        value = case["properties"].get(key, None)
+        if value is None:
+            ctx.warn(f"Warning: Case {case} does not contain property {key}, skipping.")
+            continue
+        groups.setdefault(value, []).append(case)
+
+    for value, group in groups.items():
+        if index == len(propertyKeys) - 1:
+            models = {c["model"] for c in group}
+            if len(models) > 1:
+                ctx.warn(f"Warning: Multiple models for property {key}={value} at leaf, using first.")
+            model_choice = next(iter(models))
+            case_entry = {
+                "when": f"{key}={value}",
+                "model": {
+                    "type": "minecraft:model",
+                    "model": model_choice
+                }
+            }
+        else:
+            sub_select = build_select_from_cases(ctx, group, propertyKeys, index + 1)
+            if sub_select is None:
+                continue
+            case_entry = {
+                "when": f"{key}={value}",
+                "model": sub_select
+            }
+        select["cases"].append(case_entry)
+
+    return select if select["cases"] else None
+
+def asset_matches(patterns, assetKey):
+    # patterns are namespaces, '<namespace>/<path>' prefixes (a file or directory) or globs over '<namespace>/<path>' of the input assets (None matches everything)
+    if patterns is None:
+        return True
+
+    for pattern in patterns:
+        if any(char in pattern for char in "*?["):
+            if fnmatch.fnmatchcase(assetKey, pattern):
+                return True
+        elif assetKey == pattern or assetKey.startswith(f"{pattern.rstrip('/')}/"):
+            return True
+    return False
+
+def source_matches(ctx, patterns, source):
+    # source is an input file path, in whichever layer it came from
+    return asset_matches(patterns, ctx.sourceKeys.get(source.replace("\\", "/"), ''))
+
+## Incremental Compilation
+# every blockstate/item file is compiled as a unit, recording the model/texture lookups it made (its dependencies)
+# and everything it produced (its effects), so a later build sharing the BuildCache can replay the effects instead
+# of recompiling it if neither the file nor any of its dependencies changed (e.g. when an overlay layer shadows some models)
+def record_dependency(ctx, kind, key, fingerprint):
+    # the first lookup is the one that saw the state before this unit ran
+    if ctx.unit is not None:
+        ctx.unit["deps"].setdefault((kind, key), fingerprint)
+
+def model_fingerprint(ctx, modelPath):
+    # what get_model would load the model from: its input stamp, a hash of the generated model, or None if it does not exist
+    if modelPath in ctx.modelFingerprints:
+        return ctx.modelFingerprints[modelPath]
+    namespace, path = modelPath.split(':') if ':' in modelPath else ('minecraft', modelPath)
+    stamp = resolve_asset(ctx, namespace, f"models/{path}.json")
+    if stamp is not None:
+        return stamp
+    output_file_path = os.path.join(ctx.tempDir, "assets", namespace, "models", f"{path}.json")
+    if not ctx.path_exists(output_file_path):
+        return None
+    with open(output_file_path, 'rb') as f:
+        data = f.read()
+    ctx.count("files_read")
+    ctx.count("bytes_read", len(data))
+    return ("temp", hashlib.sha1(data).hexdigest())
+
+def dependency_fingerprint(ctx, kind, key):
+    if kind == "model":
+        return model_fingerprint(ctx, key)
+    if kind == "texture_exists":
+        return texture_ever_exists(ctx, key)
+    return find_texture(ctx, key)
+
+def unit_is_current(ctx, unit, stamp):
+    if unit is None or unit["stamp"] != stamp:
+        return False
+    return all(dependency_fingerprint(ctx, kind, key) == fingerprint for (kind, key), fingerprint in unit["deps"].items())
+
+def record_effect(ctx, effect):
+    # apply it now, outside of the unit so the warnings it gives are not recorded twice
+    unit, ctx.unit = ctx.unit, None
+    try:
+        apply_effect(ctx, effect)
+    finally:
+        ctx.unit = unit
+    if unit is not None:
+        unit["effects"].append(effect)
+
+def apply_effect(ctx, effect):
+    # effects are shared between the builds that replay them, so they are never mutated
+    kind = effect[0]
+    if kind == "save":
+        save_asset(ctx, effect[1], effect[2])
+    elif kind == "warn":
+        ctx.warn(effect[1])
+    elif kind == "case_source":
+        ctx.caseSources.setdefault(effect[1], {})[effect[2]] = ctx.currentSource
+    elif kind == "block":
+        ctx.blockModelDefinitions.append(effect[1])
+    elif kind == "item_definition":
+        start_item_definition(ctx, *effect[1:])
+    elif kind == "item":
+        add_item_case(ctx, effect[1])
+    elif kind == "multipart_stats":
+        report_multipart(ctx, effect[1], effect[2])
+
+def compile_unit(ctx, namespace, relFile, compileFile):
+    assetKey = f"{namespace}/{relFile}"
+    stamp = ctx.assets[namespace][relFile]
+    cached = ctx.cache.units.get(assetKey)
+    if unit_is_current(ctx, cached, stamp):
+        ctx.count("units_reused")
+        ctx.currentSource = stamp[0].replace("\\", "/")
+        for effect in cached["effects"]:
+            apply_effect(ctx, effect)
+        return
+
+    ctx.count("units_compiled")
+    ctx.unit = {"stamp": stamp, "deps": {}, "effects": []}
+    try:
+        compileFile(ctx, namespace, relFile)
+        ctx.cache.units[assetKey] = ctx.unit
+    finally:
+        ctx.unit = None
+
+def collect_model_references(node, modelPaths):
+    if isinstance(node, list):
+        for child in node:
+            collect_model_references(child, modelPaths)
+    elif isinstance(node, dict):
+        if node.get("type") in ("minecraft:model", "model") and isinstance(node.get("model"), str):
+            modelPaths.append(node["model"])
+        elif node.get("type") in ("minecraft:special", "special") and isinstance(node.get("base"), str):
+            modelPaths.append(node["base"])
+        for child in node.values():
+            collect_model_references(child, modelPaths)
+
+def walk_model_closure(ctx, modelPaths, add_asset):
+    # calls add_asset(arcname) for the given models and every parent model and texture they reach,
+    # add_asset returns whether the asset exists (anything that doesn't is assumed to be a vanilla asset)
+    seen = set()
+    while modelPaths:
+        modelPath = modelPaths.pop()
+        if modelPath in seen:
+            continue
+        seen.add(modelPath)
+
+        namespace, path = modelPath.split(':') if ':' in modelPath else ('minecraft', modelPath)
+        if not add_asset(f"assets/{namespace}/models/{path}.json"):
+            continue
+
+        model = get_model(ctx, modelPath, False)
+        if not isinstance(model, dict):
+            continue
+        if isinstance(model.get("parent"), str):
+            modelPaths.append(model["parent"])
+        textures = model.get("textures", {})
+        for texturePath in textures.values() if isinstance(textures, dict) else []:
+            if not isinstance(texturePath, str) or texturePath.startswith("#"):
+                continue
+            textureNamespace, texture = texturePath.split(':') if ':' in texturePath else ('minecraft', texturePath)
+            if add_asset(f"assets/{textureNamespace}/textures/{texture}.png"):
+                add_asset(f"assets/{textureNamespace}/textures/{texture}.png.mcmeta")
+
+def new_vanilla_definition():
+    return {
+        "model": {
+            "type": "minecraft:select",
+            "property": "custom_model_data",
+            "index": 0,
+            "cases": []
+        }
+    }
+
+## Build Phases
+def index_inputs(ctx):
+    # later layers shadow the files of earlier ones (a shadowed file keeps its place in the walk order)
+    # every layer is named explicitly, so a missing one is most likely a typo and fails the build
+    missing = [inputDir for inputDir in ctx.inputDirs if not ctx.path_isdir(inputDir)]
+    if missing:
+        raise BuildError(f"Input directory {', '.join(missing)} does not exist." if len(missing) == 1 else f"Input directories {', '.join(missing)} do not exist.", missing)
+
+    for inputDir in ctx.inputDirs:
+        assetsDir = os.path.join(inputDir, "assets")
+        for namespace in os.listdir(assetsDir) if ctx.path_isdir(assetsDir) else []:
+            namespacePath = os.path.join(assetsDir, namespace)
+            if not ctx.path_isdir(namespacePath):
+                continue
+            assets = ctx.assets.setdefault(namespace, {})
+            for relFile in ctx.list_files(namespacePath):
+                filePath = os.path.join(namespacePath, relFile)
+                ctx.count("stat_calls")
+                stat = os.stat(filePath)
+                assets[relFile] = (filePath, stat.st_mtime_ns, stat.st_size)
+
+        for file in os.listdir(inputDir):
+            filePath = os.path.join(inputDir, file)
+            if ctx.path_isfile(filePath) and file != "assets" and file != "settings.json":
+                ctx.count("stat_calls")
+                stat = os.stat(filePath)
+                ctx.rootFiles[file] = (filePath, stat.st_mtime_ns, stat.st_size)
+
+    for namespace, assets in ctx.assets.items():
+        for relFile, stamp in assets.items():
+            ctx.sourceKeys[stamp[0].replace("\\", "/")] = f"{namespace}/{relFile}"
+            if relFile.startswith("textures/"):
+                ctx.textureNames.setdefault(namespace, {}).setdefault(relFile.split('/')[-1], []).append(relFile[len("textures/"):])
+
+def check_only_matches(ctx):
+    # a partial build that matches nothing is aborted before anything is written
+    if ctx.only is None:
+        return
+    for namespace, assets in ctx.assets.items():
+        if any(asset_matches(ctx.only, f"{namespace}/{relFile}") for relFile in assets):
+            return
+    raise BuildError(f"--only {' '.join(ctx.only)} did not match any input files.")
+
+def prepare_temp_dir(ctx):
+    # full builds keep the copied inputs that are still up to date from the last build with the same cache
+    copied = ctx.cache.copied.get(ctx.tempDir, {}) if ctx.only is None else {}
+    if ctx.path_exists(ctx.tempDir):
+        for root, dirs, files in ctx.walk(ctx.tempDir, topdown=False):
+            for name in files:
+                arcname = os.path.relpath(os.path.join(root, name), ctx.tempDir).replace("\\", "/")
+                if arcname in copied:
+                    ctx.keptFiles.add(arcname)
+                else:
+                    os.remove(os.path.join(root, name))
+            for name in dirs:
+                with contextlib.suppress(OSError):
+                    os.rmdir(os.path.join(root, name)) # (only if empty)
+    else:
+        os.makedirs(ctx.tempDir)
+    ctx.cache.copied[ctx.tempDir] = {arcname: stamp for arcname, stamp in copied.items() if arcname in ctx.keptFiles}
+
+    if get_template_archive(ctx, os.path.join(ctx.templateDir, "items", "items.zip")) is None:
+        ctx.warn(f"Warning: Template items.zip does not exist. (The generator may not work properly without it.)")
+
+def copy_input_file(ctx, arcname, stamp):
+    # skips files that are still in the temp dir from the last build if the input did not change since
+    copied = ctx.cache.copied[ctx.tempDir]
+    ctx.copiedFiles.add(arcname)
+    if arcname in ctx.keptFiles and copied.get(arcname) == stamp:
+        ctx.count("copies_skipped")
+        return
+    outputFilePath = os.path.join(ctx.tempDir, arcname)
+    os.makedirs(os.path.dirname(outputFilePath), exist_ok=True)
+    ctx.copy_file(stamp[0], outputFilePath)
+    if ctx.only is None:
+        copied[arcname] = stamp
+
+def copy_asset(ctx, namespace, relFile):
+    stamp = ctx.assets[namespace][relFile]
+    copy_input_file(ctx, f"assets/{namespace}/{relFile}", stamp)
+    ctx.assetSources[f"assets/{namespace}/{relFile}"] = stamp[0].replace("\\", "/")
+
+def copy_assets(ctx):
+    # copy over all non block/item definitions (as these are only used to generate actual assets, they are not directly assets themselves)
+    # partial builds only copy the matching ones here, the rest of what they need is copied by copy_reachable_assets
+    for namespace, assets in ctx.assets.items():
+        for relFile in assets:
             if relFile.startswith("blocks/") or relFile.startswith("items/"):
                 continue
 
-            inputFilePath = os.path.join(root, file)
-            outputFilePath = os.path.join(tempDir, "assets", namespace, relFile)
-            os.makedirs(os.path.dirname(outputFilePath), exist_ok=True)
-            shutil.copyfile(inputFilePath, outputFilePath)
+            ctx.onlyCounts["assets"][1] += 1
+            if not asset_matches(ctx.only, f"{namespace}/{relFile}"):
+                continue
+            ctx.onlyCounts["assets"][0] += 1
+            copy_asset(ctx, namespace, relFile)
 
-for file in os.listdir(INPUT_DIR):
-    inputFilePath = os.path.join(INPUT_DIR, file)
-    if os.path.isfile(inputFilePath) and file != "assets" and file != "settings.json":
-        outputFilePath = os.path.join(tempDir, file)
+    for file, stamp in ctx.rootFiles.items():
+        inputFilePath = stamp[0]
+        outputFilePath = os.path.join(ctx.tempDir, file)
         if file == "pack.mcmeta":
             with open(inputFilePath, 'r', encoding='utf-8') as f:
                 contents = f.read()
-            contents = contents.replace("{version}", str(settings.get("version", "")))
+            ctx.count("files_read")
+            ctx.count("bytes_read", len(contents.encode('utf-8')))
+            ctx.packMeta = contents
+            contents = contents.replace("{version}", str(ctx.version))
             with open(outputFilePath, 'w', encoding='utf-8', newline='\n') as f:
                 f.write(contents)
+            ctx.count("files_written")
+            ctx.count("bytes_written", len(contents.encode('utf-8')))
         else:
-            shutil.copyfile(inputFilePath, outputFilePath)
-
-
-## Generate from blockstate files:
-for namespace in os.listdir(os.path.join(INPUT_DIR, "assets")):
-    namespacePath = os.path.join(INPUT_DIR, "assets", namespace)
-    if not os.path.isdir(namespacePath):
-        continue
-
-    blocksPath = os.path.join(namespacePath, "blocks")
-    if not os.path.exists(blocksPath):
-        continue
-
-    blockStates = []
-    for root, dirs, files in os.walk(blocksPath):
-        for file in files:
-            relDir = os.path.relpath(root, blocksPath)
-            relFile = os.path.join(relDir, file) if relDir != '.' else file
-            relFile = relFile.replace("\\", "/")
-            if os.path.isfile(os.path.join(root, file)):
-                blockStates.append(relFile)
-
-    for blockFile in blockStates:
-        if not blockFile.endswith(".json"):
-            if logWarnings:
-                print(f"Warning: Block file {blockFile} is not a json file, skipping.")
-            continue
+            copy_input_file(ctx, file, stamp)
+        ctx.assetSources[file] = inputFilePath.replace("\\", "/")
+
+    # drop the files kept from the last build whose input is gone
+    copied = ctx.cache.copied[ctx.tempDir]
+    for arcname in [arcname for arcname in ctx.keptFiles if arcname not in ctx.copiedFiles]:
+        os.remove(os.path.join(ctx.tempDir, arcname))
+        copied.pop(arcname, None)
+        ctx.keptFiles.discard(arcname)
+
+def compile_blockstates(ctx):
+    for namespace, assets in ctx.assets.items():
+        for relFile in [relFile for relFile in assets if relFile.startswith("blocks/")]:
+            ctx.onlyCounts["blockstates"][1] += 1
+            if not asset_matches(ctx.only, f"{namespace}/{relFile}"):
+                continue
+            ctx.onlyCounts["blockstates"][0] += 1
+            compile_unit(ctx, namespace, relFile, compile_blockstate)
+    ctx.currentSource = None
+
+def compile_blockstate(ctx, namespace, relFile):
+    blockFile = relFile[len("blocks/"):]
+    if not blockFile.endswith(".json"):
+        ctx.warn(f"Warning: Block file {blockFile} is not a json file, skipping.")
+        return
 
-        blockFilePath = os.path.join(blocksPath, blockFile)
-        with open(blockFilePath, 'r') as f:
-            blockData = json.load(f)
+    blockFilePath = ctx.assets[namespace][relFile][0]
+    ctx.currentSource = blockFilePath.replace("\\", "/")
+    blockData = ctx.read_json(blockFilePath)
 
-        if "multipart" in blockData:
-            if logWarnings:
-                print(f"Warning: Block file {blockFilePath} contains multipart definitions, which are not yet supported, skipping.")
-            continue
+    if "multipart" in blockData and "variants" in blockData:
+        ctx.warn(f"Warning: Block file {blockFilePath} contains both multipart and variants definitions, skipping.")
+        return
 
-        if "variants" in blockData and (not isinstance(blockData["variants"], dict) or len(blockData["variants"]) == 0):
-            if logWarnings:
-                print(f"Warning: Block file {blockFilePath} does not contain valid variants, skipping.")
-            continue
-        variants = blockData["variants"] if "variants" in blockData else {}
+    if "multipart" in blockData and (not isinstance(blockData["multipart"], list) or len(blockData["multipart"]) == 0):
+        ctx.warn(f"Warning: Block file {blockFilePath} does not contain valid multipart definitions, skipping.")
+        return
+    multipart = blockData["multipart"] if "multipart" in blockData else []
 
-        if len(variants) > 1 and ("properties" not in blockData or not isinstance(blockData["properties"], list)):
-            if logWarnings:
-                print(f"Warning: Block file {blockFilePath} does not contain a list of possible properties, skipping.")
-            continue
-        allPropertyKeys = blockData["properties"] if "properties" in blockData else []
-        allPropertyValues = {}
-        for key in allPropertyKeys:
-            allPropertyValues[key] = []
-
-        blockPath = blockFile[:-5]
-        blockName = blockPath.split('/')[-1] if '/' in blockPath else blockPath
-        blockNamespace = namespace
-        blockId = blockName
-        if "id" in blockData:
-            blockId = blockData["id"]
-        if "namespace" in blockData:
-            blockNamespace = blockData["namespace"]
-        blockKey = f"{blockNamespace}:{blockId}"
-
-        blockModel = {}
-        blockModelDefinition = {
-            "vanilla": blockData["vanilla"] if "vanilla" in blockData else "air",
-            "case": {
-                "when": blockKey
-            }
+    if "variants" in blockData and (not isinstance(blockData["variants"], dict) or len(blockData["variants"]) == 0):
+        ctx.warn(f"Warning: Block file {blockFilePath} does not contain valid variants, skipping.")
+        return
+    variants = blockData["variants"] if "variants" in blockData else {}
+
+    if (len(variants) > 1 or any(isinstance(part, dict) and "when" in part for part in multipart)) and ("properties" not in blockData or not isinstance(blockData["properties"], list)):
+        ctx.warn(f"Warning: Block file {blockFilePath} does not contain a list of possible properties, skipping.")
+        return
+    allPropertyKeys = blockData["properties"] if "properties" in blockData else []
+    allPropertyValues = {}
+    for key in allPropertyKeys:
+        allPropertyValues[key] = []
+
+    blockPath = blockFile[:-5]
+    blockName = blockPath.split('/')[-1] if '/' in blockPath else blockPath
+    blockNamespace = namespace
+    blockId = blockName
+    if "id" in blockData:
+        blockId = blockData["id"]
+    if "namespace" in blockData:
+        blockNamespace = blockData["namespace"]
+    blockKey = f"{blockNamespace}:{blockId}"
+
+    blockModel = {}
+    blockModelDefinition = {
+        "vanilla": blockData["vanilla"] if "vanilla" in blockData else "air",
+        "case": {
+            "when": blockKey
         }
-        cases = []
+    }
+    vanillaItem = blockModelDefinition["vanilla"] if ":" in blockModelDefinition["vanilla"] else f"minecraft:{blockModelDefinition['vanilla']}"
+    record_effect(ctx, ("case_source", vanillaItem, blockKey))
+    cases = []
 
-        displayType = blockData["display"] if "display" in blockData else "fixed"
+    displayType = blockData["display"] if "display" in blockData else "fixed"
 
-        if (variants == {}) :
-            modelPath = f"{namespace}:block/{blockName}"
-            if (get_model(modelPath, False) is not None):
-                model = get_model(modelPath, False)
-            else:
-                modelPath = f"{namespace}:block/{blockPath}"
-                model = get_model(modelPath, False)
-            
-            if model is None:
-                if texture_ever_exists(f"{namespace}:block/{blockName}"):
-                    texturePath = find_texture(f"{namespace}:block/{blockName}")
-                    modelPath = texturePath
-                    model = {
-                        "parent": "block/cube_all",
-                        "textures": {
-                            "all": texturePath,
-                            "particle": texturePath
-                        },
-                        "display": {
-                            "fixed": {}
-                        }
+    if multipart:
+        blockModel = compile_multipart(ctx, blockFilePath, blockKey, blockData, allPropertyKeys, displayType)
+        if blockModel is None:
+            return
+        blockModelDefinition["case"]["model"] = blockModel
+        record_effect(ctx, ("block", blockModelDefinition))
+        return
+
+    if (variants == {}) :
+        modelPath = f"{namespace}:block/{blockName}"
+        if (get_model(ctx, modelPath, False) is not None):
+            model = get_model(ctx, modelPath, False)
+        else:
+            modelPath = f"{namespace}:block/{blockPath}"
+            model = get_model(ctx, modelPath, False)
+
+        if model is None:
+            if texture_ever_exists(ctx, f"{namespace}:block/{blockName}"):
+                texturePath = find_texture(ctx, f"{namespace}:block/{blockName}")
+                modelPath = texturePath
+                model = {
+                    "parent": "block/cube_all",
+                    "textures": {
+                        "all": texturePath,
+                        "particle": texturePath
+                    },
+                    "display": {
+                        "fixed": {}
                     }
-                    if "author" in blockData:
-                        model["author"] = blockData["author"]
-                    save_model(modelPath, model)
-                else:
-                    if logWarnings:
-                        print(f"Warning: Block file {blockFilePath} does not contain any variants and no model or texture to generate a model could be found for it, skipping.")
-                    continue
-            
-            variants[""] = {
-                "model": modelPath
-            }
+                }
+                if "author" in blockData:
+                    model["author"] = blockData["author"]
+                save_model(ctx, modelPath, model)
+            else:
+                ctx.warn(f"Warning: Block file {blockFilePath} does not contain any variants and no model or texture to generate a model could be found for it, skipping.")
+                return
 
-        for name, variant in variants.items():
-            if "model" not in variant:
-                if logWarnings:
-                    print(f"Warning: Block variant {name} does not contain a model, skipping.")
-                continue
+        variants[""] = {
+            "model": modelPath
+        }
 
-            if "author" in blockData:
-                variant["author"] = blockData["author"]
-
-            properties = {}
-            for prop in name.split(','):
-                if '=' not in prop:
-                    if name != "" and logWarnings:
-                        print(f"Warning: Block variant {name} contains invalid property {prop}, skipping.")
-                    continue
-                key, value = prop.split('=')
-                properties[key] = value
-                if key not in allPropertyKeys:
-                    if logWarnings:
-                        print(f"Warning: Block variant {name} contains property {key} which is not in the block's property list, ignoring it.")
-                if value not in allPropertyValues[key]:
-                    allPropertyValues[key].append(value)
-
-            modelPath = create_block_model_variant(name, variant, displayType)
-            if modelPath is None:
-                continue
+    for name, variant in variants.items():
+        if "model" not in variant:
+            ctx.warn(f"Warning: Block variant {name} does not contain a model, skipping.")
+            continue
 
-            cases.append({
-                "properties": properties,
-                "model": modelPath
-            })
+        if "author" in blockData:
+            variant["author"] = blockData["author"]
 
-        def build_select_from_cases(cases_list, propertyKeys, index=0):
-            if index >= len(propertyKeys):
-                return None
+        properties = {}
+        for prop in name.split(','):
+            if '=' not in prop:
+                if name != "":
+                    ctx.warn(f"Warning: Block variant {name} contains invalid property {prop}, skipping.")
+                continue
+            key, value = prop.split('=')
+            properties[key] = value
+            if key not in allPropertyKeys:
+                ctx.warn(f"Warning: Block variant {name} contains property {key} which is not in the block's property list, ignoring it.")
+            if value not in allPropertyValues[key]:
+                allPropertyValues[key].append(value)
+
+        modelPath = create_block_model_variant(ctx, name, variant, displayType)
+        if modelPath is None:
+            continue
 
-            key = propertyKeys[index]
-            select = {
-                "type": "minecraft:select",
-                "property": "custom_model_data",
-                "index": index + 1, # plus one because the first index is the block model id itself
-                "cases": []
-            }
+        cases.append({
+            "properties": properties,
+            "model": modelPath
+        })
 
-            groups = {}
-            for case in cases_list:
-                value = case["properties"].get(key, None)
-                if value is None:
-                    if logWarnings:
-                        print(f"Warning: Case {case} does not contain property {key}, skipping.")
-                    continue
-                groups.setdefault(value, []).append(case)
-
-            for value, group in groups.items():
-                if index == len(propertyKeys) - 1:
-                    models = {c["model"] for c in group}
-                    if len(models) > 1:
-                        if logWarnings:
-                            print(f"Warning: Multiple models for property {key}={value} at leaf, using first.")
-                    model_choice = next(iter(models))
-                    case_entry = {
-                        "when": f"{key}={value}",
-                        "model": {
-                            "type": "minecraft:model",
-                            "model": model_choice
-                        }
-                    }
-                else:
-                    sub_select = build_select_from_cases(group, propertyKeys, index + 1)
-                    if sub_select is None:
-                        continue
-                    case_entry = {
-                        "when": f"{key}={value}",
-                        "model": sub_select
-                    }
-                select["cases"].append(case_entry)
+    if len(cases) == 1 and (not cases[0].get("properties")):
+        blockModel = {
+            "type": "minecraft:model",
+            "model": cases[0]["model"]
+        }
+    else:
+        blockModel = build_select_from_cases(ctx, cases, allPropertyKeys, 0)
+    blockModelDefinition["case"]["model"] = blockModel
+    record_effect(ctx, ("block", blockModelDefinition))
+
+def multipart_apply(part):
+    # the model a multipart part applies (the first of a weighted list, without its weight), None if it has none
+    apply = part.get("apply", None) if isinstance(part, dict) else None
+    if isinstance(apply, list):
+        apply = apply[0] if len(apply) > 0 else None
+        if isinstance(apply, dict):
+            apply = {key: value for key, value in apply.items() if key != "weight"}
+    return apply if isinstance(apply, dict) and "model" in apply else None
+
+def multipart_value(value):
+    return value if isinstance(value, str) else json.dumps(value)
+
+def collect_multipart_values(when, propertyValues):
+    if not isinstance(when, dict):
+        return
+    for key, values in when.items():
+        if key in ("OR", "AND"):
+            for condition in values if isinstance(values, list) else []:
+                collect_multipart_values(condition, propertyValues)
+            continue
+        for value in multipart_value(values).split('|'):
+            if value not in propertyValues.setdefault(key, []):
+                propertyValues[key].append(value)
+
+def invalid_multipart_operators(when, key="when"):
+    # the keys of the 'OR'/'AND' values in a condition that are not lists of conditions (objects), every other key is a property
+    invalid = []
+    for operator in ("OR", "AND"):
+        if operator not in when:
+            continue
+        conditions = when[operator]
+        if not isinstance(conditions, list) or not all(isinstance(condition, dict) for condition in conditions):
+            invalid.append(f"{key}.{operator}")
+            continue
+        for j, condition in enumerate(conditions):
+            invalid += invalid_multipart_operators(condition, f"{key}.{operator}[{j}]")
+    return invalid
 
-            return select if select["cases"] else None
+def multipart_matches(when, properties):
+    # a property set to None has a value that no condition lists
+    if when is None:
+        return True
+    if "OR" in when:
+        return any(multipart_matches(condition, properties) for condition in when["OR"])
+    if "AND" in when:
+        return all(multipart_matches(condition, properties) for condition in when["AND"])
+    return all(properties.get(key) in multipart_value(values).split('|') for key, values in when.items())
+
+def build_multipart_select(part, keys, allPropertyKeys, propertyValues, properties=None, index=0):
+    # a select over just the properties this part's condition mentions, identical branches share one case
+    # the fallback covers the values no condition lists, which can still match through another branch of an 'OR'
+    properties = properties if properties is not None else {}
+    if index >= len(keys):
+        if not multipart_matches(part["when"], properties):
+            return None
+        return {
+            "type": "minecraft:model",
+            "model": part["model"]
+        }
 
-        if len(cases) == 1 and (not cases[0].get("properties")):
-            blockModel = {
-                "type": "minecraft:model",
-                "model": cases[0]["model"]
-            }
+    key = keys[index]
+    cases = []
+    for value in propertyValues[key]:
+        subModel = build_multipart_select(part, keys, allPropertyKeys, propertyValues, {**properties, key: value}, index + 1)
+        if subModel is None:
+            continue
+        for case in cases:
+            if case["model"] == subModel:
+                case["when"].append(f"{key}={value}")
+                break
         else:
-            blockModel = build_select_from_cases(cases, allPropertyKeys, 0)
-        blockModelDefinition["case"]["model"] = blockModel
-        blockModelDefinitions.append(blockModelDefinition)
-
-## Append the block model cases to the vanilla item model definitions
-# uses the select model type against the 0 index of custom_model_data
-for modelDef in blockModelDefinitions:
-    vanillaItem = modelDef["vanilla"]
-    if not ":" in vanillaItem:
-        vanillaItem = f"minecraft:{vanillaItem}"
+            cases.append({
+                "when": [f"{key}={value}"],
+                "model": subModel
+            })
 
-    vanillaDefinition = itemModelDefinitions[vanillaItem] if vanillaItem in itemModelDefinitions else {
-        "model": {
-            "type": "minecraft:select",
-            "property": "custom_model_data",
-            "index": 0,
-            "cases": []
+    fallback = build_multipart_select(part, keys, allPropertyKeys, propertyValues, {**properties, key: None}, index + 1)
+    cases = [case for case in cases if case["model"] != fallback]
+    if not cases:
+        return fallback
+
+    for case in cases:
+        if len(case["when"]) == 1:
+            case["when"] = case["when"][0]
+    return {
+        "type": "minecraft:select",
+        "property": "custom_model_data",
+        "index": allPropertyKeys.index(key) + 1, # plus one because the first index is the block model id itself
+        "cases": cases,
+        "fallback": fallback if fallback is not None else {
+            "type": "minecraft:empty"
         }
     }
-    vanillaDefinition["model"]["cases"].append(modelDef["case"])
-    itemModelDefinitions[vanillaItem] = vanillaDefinition
-
-## Now handle item definition files:
-# First compile all of the different cases
-for namespace in os.listdir(os.path.join(INPUT_DIR, "assets")):
-    namespacePath = os.path.join(INPUT_DIR, "assets", namespace)
-    if not os.path.isdir(namespacePath):
-        continue
-
-    itemsPath = os.path.join(namespacePath, "items")
-    if not os.path.exists(itemsPath):
-        continue
-
-    itemFiles = []
-    for root, dirs, files in os.walk(itemsPath):
-        for file in files:
-            relDir = os.path.relpath(root, itemsPath)
-            relFile = os.path.join(relDir, file) if relDir != '.' else file
-            relFile = relFile.replace("\\", "/")
-            if os.path.isfile(os.path.join(root, file)):
-                itemFiles.append(relFile)
-
-    for itemFile in itemFiles:
-        if not itemFile.endswith(".json"):
-            if logWarnings:
-                print(f"Warning: Item file {itemFile} is not a json file, skipping.")
+
+def enumerate_variant_cases(parts, keys, propertyValues):
+    # what the same block would look like written out as variants, one case per combination of property values
+    # (a combination several parts apply to would need its own merged model, named after the models it merges here)
+    cases = []
+    for combination in itertools.product(*(propertyValues[key] for key in keys)):
+        properties = dict(zip(keys, combination))
+        models = [part["model"] for part in parts if multipart_matches(part["when"], properties)]
+        if models:
+            cases.append({
+                "properties": properties,
+                "model": "+".join(models)
+            })
+    return cases
+
+def compile_multipart(ctx, blockFilePath, blockKey, blockData, allPropertyKeys, displayType):
+    parts = []
+    for i, part in enumerate(blockData["multipart"]):
+        name = f"{blockKey} multipart[{i}]"
+        if isinstance(part, dict) and isinstance(part.get("apply"), list) and len(part["apply"]) > 1:
+            ctx.warn(f"Warning: Block part {name} contains a list of weighted models, which are not supported, using the first.")
+        apply = multipart_apply(part)
+        if apply is None:
+            ctx.warn(f"Warning: Block part {name} does not contain a model, skipping.")
             continue
 
-        itemFilePath = os.path.join(itemsPath, itemFile)
-        with open(itemFilePath, 'r') as f:
-            itemData = json.load(f)
-
-        itemPath = itemFile[:-5]
-        itemName = itemPath.split('/')[-1] if '/' in itemPath else itemPath
-        itemNamespace = namespace
-        itemId = itemName
-        if "id" in itemData:
-            itemId = itemData["id"]
-        if "namespace" in itemData:
-            itemNamespace = itemData["namespace"]
-        itemKey = f"{itemNamespace}:{itemId}"
-        
-        if "vanilla" not in itemData or not isinstance(itemData["vanilla"], str):
-            if logWarnings:
-                print(f"Warning: Item file {itemFilePath} does not contain a valid vanilla item id, skipping.")
+        when = part.get("when", None)
+        if when is not None and not isinstance(when, dict):
+            ctx.warn(f"Warning: Block part {name} contains invalid when value (should be an object of properties, 'OR' or 'AND'), skipping.")
+            continue
+        if when is not None and invalid_multipart_operators(when):
+            ctx.warn(f"Warning: Block part {name} contains invalid 'OR' or 'AND' value (should be a list of objects), skipping.")
             continue
-        vanillaItem = itemData["vanilla"]
+        partValues = {}
+        collect_multipart_values(when, partValues)
+        unknownKeys = [key for key in partValues if key not in allPropertyKeys]
+        if unknownKeys:
+            ctx.warn(f"Warning: Block part {name} contains properties {unknownKeys} which are not in the block's property list, skipping.")
+            continue
+
+        apply = dict(apply)
+        if "author" in blockData:
+            apply["author"] = blockData["author"]
+        modelPath = create_block_model_variant(ctx, name, apply, displayType)
+        if modelPath is None:
+            continue
+
+        parts.append({
+            "when": when,
+            "keys": [key for key in allPropertyKeys if key in partValues],
+            "model": modelPath
+        })
+
+    if not parts:
+        ctx.warn(f"Warning: Block file {blockFilePath} does not contain any valid multipart definitions, skipping.")
+        return None
+
+    propertyValues = {}
+    for part in parts:
+        collect_multipart_values(part["when"], propertyValues)
+
+    partModels = []
+    for part in parts:
+        partModel = build_multipart_select(part, part["keys"], allPropertyKeys, propertyValues)
+        if partModel is not None:
+            partModels.append(partModel)
+    if not partModels:
+        ctx.warn(f"Warning: Block file {blockFilePath} multipart conditions can never match, skipping.")
+        return None
+    blockModel = partModels[0] if len(partModels) == 1 else {
+        "type": "minecraft:composite",
+        "models": partModels
+    }
+
+    # report the size of the composite against what enumerating every combination as variants would cost
+    # (measured on the select build_select_from_cases makes of them, as for a blockstate written with variants)
+    keys = [key for key in allPropertyKeys if key in propertyValues]
+    combinations = 1
+    nodes = 1 # the selects and models of that select
+    for key in keys:
+        combinations *= len(propertyValues[key])
+        nodes += combinations
+    compositeBytes = len(json.dumps(blockModel))
+    variantBytes = None
+    if nodes <= MULTIPART_ENUMERATION_LIMIT:
+        cases = enumerate_variant_cases(parts, keys, propertyValues)
+        if keys:
+            variantModel = build_select_from_cases(ctx, cases, keys, 0)
+        else:
+            variantModel = {"type": "minecraft:model", "model": cases[0]["model"]} if cases else None
+        variantBytes = len(json.dumps(variantModel))
+    record_effect(ctx, ("multipart_stats", blockKey, {
+        "parts": len(parts),
+        "combinations": combinations,
+        "composite_bytes": compositeBytes,
+        "variant_bytes": variantBytes
+    }))
+    return blockModel
+
+def report_multipart(ctx, blockKey, multipartStats):
+    # only recorded in the build report ("multipart"), variant_bytes is None if there are too many combinations to enumerate
+    ctx.stats.setdefault("multipart", {})[blockKey] = dict(multipartStats)
+
+def merge_block_definitions(ctx):
+    # append the block model cases to the vanilla item model definitions
+    # uses the select model type against the 0 index of custom_model_data
+    for modelDef in ctx.blockModelDefinitions:
+        vanillaItem = modelDef["vanilla"]
         if not ":" in vanillaItem:
             vanillaItem = f"minecraft:{vanillaItem}"
 
-        vanillaDefinition = itemModelDefinitions[vanillaItem] if vanillaItem in itemModelDefinitions else {
-            "model": {
-                "type": "minecraft:select",
-                "property": "custom_model_data",
-                "index": 0,
-                "cases": []
-            }
-        }
-        vanillaCases = vanillaDefinition["model"]["cases"] if "cases" in vanillaDefinition["model"] else []
-        
-        if "fallback" in itemData:
-            if "fallback" in vanillaDefinition:
-                if logWarnings:
-                    print(f"Warning: Item file {itemFilePath} contains a fallback but one is already defined for {vanillaItem}, overwriting fallback {vanillaDefinition['fallback']}.")
-            vanillaDefinition["fallback"] = itemData["fallback"]
-
-        if "oversized_in_gui" in itemData:
-            if itemData["oversized_in_gui"] != True:
-                if logWarnings:
-                    print(f"Warning: Item file {itemFilePath} contains invalid oversized_in_gui value (should only ever be 'true'), skipping.")
+        vanillaDefinition = ctx.itemModelDefinitions[vanillaItem] if vanillaItem in ctx.itemModelDefinitions else new_vanilla_definition()
+        vanillaDefinition["model"]["cases"].append(modelDef["case"])
+        ctx.itemModelDefinitions[vanillaItem] = vanillaDefinition
+
+def compile_items(ctx):
+    for namespace, assets in ctx.assets.items():
+        for relFile in [relFile for relFile in assets if relFile.startswith("items/")]:
+            ctx.onlyCounts["items"][1] += 1
+            if not asset_matches(ctx.only, f"{namespace}/{relFile}"):
                 continue
-            vanillaDefinition["oversized_in_gui"] = True
-        
-        case = None
-        if "model" in itemData:
-            model = itemData["model"]
-            if isinstance(model, dict):
-                # TODO: validate model definition somehow
-                case = {
-                    "when": f"{itemKey}",
+            ctx.onlyCounts["items"][0] += 1
+            compile_unit(ctx, namespace, relFile, compile_item)
+    ctx.currentSource = None
+
+def compile_item(ctx, namespace, relFile):
+    itemFile = relFile[len("items/"):]
+    if not itemFile.endswith(".json"):
+        ctx.warn(f"Warning: Item file {itemFile} is not a json file, skipping.")
+        return
+
+    itemFilePath = ctx.assets[namespace][relFile][0]
+    ctx.currentSource = itemFilePath.replace("\\", "/")
+    itemData = ctx.read_json(itemFilePath)
+
+    itemPath = itemFile[:-5]
+    itemName = itemPath.split('/')[-1] if '/' in itemPath else itemPath
+    itemNamespace = namespace
+    itemId = itemName
+    if "id" in itemData:
+        itemId = itemData["id"]
+    if "namespace" in itemData:
+        itemNamespace = itemData["namespace"]
+    itemKey = f"{itemNamespace}:{itemId}"
+
+    if "vanilla" not in itemData or not isinstance(itemData["vanilla"], str):
+        ctx.warn(f"Warning: Item file {itemFilePath} does not contain a valid vanilla item id, skipping.")
+        return
+    vanillaItem = itemData["vanilla"]
+    if not ":" in vanillaItem:
+        vanillaItem = f"minecraft:{vanillaItem}"
+    record_effect(ctx, ("case_source", vanillaItem, itemKey))
+    # (the fallback is applied even if the item is skipped further down)
+    record_effect(ctx, ("item_definition", vanillaItem, itemFilePath, "fallback" in itemData, itemData.get("fallback"), itemData.get("oversized_in_gui") == True))
+
+    if "oversized_in_gui" in itemData and itemData["oversized_in_gui"] != True:
+        ctx.warn(f"Warning: Item file {itemFilePath} contains invalid oversized_in_gui value (should only ever be 'true'), skipping.")
+        return
+
+    case = None
+    if "model" in itemData:
+        model = itemData["model"]
+        if isinstance(model, dict):
+            # TODO: validate model definition somehow
+            case = {
+                "when": f"{itemKey}",
+                "model": model
+            }
+        elif isinstance(model, str):
+            get_model(ctx, model, True)
+            case = {
+                "when": f"{itemKey}",
+                "model": {
+                    "type": "minecraft:model",
                     "model": model
                 }
-            elif isinstance(model, str):
-                get_model(model, True)
+            }
+        else:
+            ctx.warn(f"Warning: Item file {itemFilePath} contains invalid model value (should be a full definition or inlined model reference), skipping.")
+            return
+    else:
+        modelPath = f"{namespace}:item/{itemName}"
+        if (get_model(ctx, modelPath, False) is not None):
+            model = get_model(ctx, modelPath, False)
+        else:
+            modelPath = f"{namespace}:item/{itemPath}"
+            model = get_model(ctx, modelPath, False)
+
+        if model is None:
+            modelPath = f"{namespace}:block/{itemName}"
+            if (get_model(ctx, modelPath, False) is not None):
+                model = get_model(ctx, modelPath, False)
+            else:
+                modelPath = f"{namespace}:block/{itemPath}"
+                model = get_model(ctx, modelPath, False)
+
+            if model is not None:
+                if "display" in model and "fixed" in model["display"]:
+                    model["display"]["fixed"] = {
+                        "scale": [0.5, 0.5, 0.5]
+                    }
+                    modelPath = f"{namespace}:item/{itemPath}"
+                    save_model(ctx, modelPath, model)
                 case = {
                     "when": f"{itemKey}",
                     "model": {
                         "type": "minecraft:model",
-                        "model": model
+                        "model": modelPath
                     }
                 }
-            else:
-                if logWarnings:
-                    print(f"Warning: Item file {itemFilePath} contains invalid model value (should be a full definition or inlined model reference), skipping.")
-                continue
-        else:
-            modelPath = f"{namespace}:item/{itemName}"
-            if (get_model(modelPath, False) is not None):
-                model = get_model(modelPath, False)
-            else:
-                modelPath = f"{namespace}:item/{itemPath}"
-                model = get_model(modelPath, False)
-
-            if model is None:
-                modelPath = f"{namespace}:block/{itemName}"
-                if (get_model(modelPath, False) is not None):
-                    model = get_model(modelPath, False)
-                else:
-                    modelPath = f"{namespace}:block/{itemPath}"
-                    model = get_model(modelPath, False)
-
-                if model is not None:
-                    if "display" in model and "fixed" in model["display"]:
-                        model["display"]["fixed"] = {
-                            "scale": [0.5, 0.5, 0.5]
-                        }
-                        modelPath = f"{namespace}:item/{itemPath}"
-                        save_model(modelPath, model)
-                    case = {
-                        "when": f"{itemKey}",
-                        "model": {
-                            "type": "minecraft:model",
-                            "model": modelPath
-                        }
-                    }
-                elif texture_ever_exists(f"{namespace}:item/{itemName}"):
-                    texturePath = find_texture(f"{namespace}:item/{itemName}")
-                    modelPath = texturePath
-                    model = {
-                        "parent": "item/generated",
-                        "textures": {
-                            "layer0": texturePath,
-                            "particle": texturePath
-                        }
+            elif texture_ever_exists(ctx, f"{namespace}:item/{itemName}"):
+                texturePath = find_texture(ctx, f"{namespace}:item/{itemName}")
+                modelPath = texturePath
+                model = {
+                    "parent": "item/generated",
+                    "textures": {
+                        "layer0": texturePath,
+                        "particle": texturePath
                     }
-                    if "author" in itemData:
-                        model["author"] = itemData["author"]
-                    save_model(modelPath, model)
-                    case = {
-                        "when": f"{itemKey}",
-                        "model": {
-                            "type": "minecraft:model",
-                            "model": modelPath
-                        }
-                    }
-                elif texture_ever_exists(f"{namespace}:block/{itemName}"):
-                    texturePath = find_texture(f"{namespace}:block/{itemName}")
-                    modelPath = texturePath
-                    model = {
-                        "parent": "block/cube_all",
-                        "textures": {
-                            "all": texturePath
-                        }
+                }
+                if "author" in itemData:
+                    model["author"] = itemData["author"]
+                save_model(ctx, modelPath, model)
+                case = {
+                    "when": f"{itemKey}",
+                    "model": {
+                        "type": "minecraft:model",
+                        "model": modelPath
                     }
-                    if "author" in itemData:
-                        model["author"] = itemData["author"]
-                    save_model(modelPath, model)
-                    case = {
-                        "when": f"{itemKey}",
-                        "model": {
-                            "type": "minecraft:model",
-                            "model": modelPath
-                        }
+                }
+            elif texture_ever_exists(ctx, f"{namespace}:block/{itemName}"):
+                texturePath = find_texture(ctx, f"{namespace}:block/{itemName}")
+                modelPath = texturePath
+                model = {
+                    "parent": "block/cube_all",
+                    "textures": {
+                        "all": texturePath
                     }
-                else:
-                    if logWarnings:
-                        print(f"Warning: Item file {itemFilePath} does not contain a model and no model or texture to generate a model could be found for it, skipping.")
-                    continue
-            else:
+                }
+                if "author" in itemData:
+                    model["author"] = itemData["author"]
+                save_model(ctx, modelPath, model)
                 case = {
                     "when": f"{itemKey}",
                     "model": {
@@ -676,107 +1352,134 @@ for namespace in os.listdir(os.path.join(INPUT_DIR, "assets")):
                         "model": modelPath
                     }
                 }
-
-        if "tints" in itemData:
-            tints = itemData["tints"]
-            if not isinstance(tints, list) or len(tints) == 0:
-                if logWarnings:
-                    print(f"Warning: Item file {itemFilePath} contains invalid tints value (should be a non-empty list), skipping.")
-                continue
-            elif not case["model"]["type"] == "minecraft:model":
-                if logWarnings:
-                    print(f"Warning: Item file {itemFilePath} contains tints but its model type is not 'minecraft:model', skipping.")
-                continue
             else:
-                case["model"]["tints"] = tints
-        
-        if "create_trims" in itemData:
-            trimType = itemData["create_trims"]
-            if trimType not in TRIM_TYPES:
-                if logWarnings:
-                    print(f"Warning: Item file {itemFilePath} contains invalid trimmable type {trimType} (must be one of {TRIM_TYPES}), skipping.")
-                continue
-            elif case["model"]["type"] != "minecraft:model":
-                if logWarnings:
-                    print(f"Warning: Item file {itemFilePath} contains trimmable value but its model type is not 'minecraft:model', skipping.")
-                continue
-
-            modelPath = case["model"]["model"]
-            model = get_model(modelPath)
-            if model is None:
-                if logWarnings:
-                    print(f"Warning: Item file {itemFilePath} trimmable model {modelPath} could not be found, skipping.")
-                continue
-            elif "parent" not in model or model["parent"] != "item/generated":
-                if logWarnings:
-                    print(f"For automatic trims, item model {modelPath} must have parent 'item/generated', skipping.")
-                continue
-
-            trimCases = []
+                ctx.warn(f"Warning: Item file {itemFilePath} does not contain a model and no model or texture to generate a model could be found for it, skipping.")
+                return
+        else:
             case = {
                 "when": f"{itemKey}",
                 "model": {
-                    "type": "minecraft:select",
-                    "property": "trim_material",
-                    "cases": trimCases,
-                    "fallback": case["model"]
+                    "type": "minecraft:model",
+                    "model": modelPath
                 }
             }
 
-            for trim in TRIMS:
-                trimModelPath = f"{modelPath}_trim_{trim}"
-                trimModel = copy.deepcopy(model)
-                
-                particleLayer = None
-                if "particle" in trimModel["textures"]:
-                    particleLayer = trimModel["textures"].pop("particle")
-                trimModel["textures"][f"layer{len(trimModel['textures'])}"] = f"trims/items/{trimType}_trim_{trim}"
-                if particleLayer is not None:
-                    trimModel["textures"]["particle"] = particleLayer
-                
-                save_model(trimModelPath, trimModel)
-                trimCases.append({
-                    "when": trim,
-                    "model": {
-                        "type": "minecraft:model",
-                        "model": trimModelPath
-                    }
-                })
-        
-        vanillaCases.append(case)
-        vanillaDefinition["model"]["cases"] = vanillaCases
-        itemModelDefinitions[vanillaItem] = vanillaDefinition
-                    
-# Then create each item definition
-for itemPath, itemDef in itemModelDefinitions.items():
-    namespace, itemName = itemPath.split(':') if ':' in itemPath else ('minecraft', itemPath)
-    if "fallback" not in itemDef["model"]:
-        template = get_template(f"items/{itemName}")
-        if template is None:
-            template = {"model": {"type": "minecraft:model", "model": f"minecraft:item/{itemName}"} }
-        itemDef["model"]["fallback"] = template["model"]
-    save_item_definition(itemPath, itemDef)
-
-# Add the atlas appends
-itemAtlasSources = []
-blockAtlasSources = []
-# find all textures under assets/<namespace>/textures/item and assets/<namespace>/textures/block
-for namespace in os.listdir(os.path.join(INPUT_DIR, "assets")):
-    namespacePath = os.path.join(INPUT_DIR, "assets", namespace)
-    if not os.path.isdir(namespacePath):
-        continue
-
-    texturesPath = os.path.join(namespacePath, "textures")
-    if not os.path.exists(texturesPath):
-        continue
-
-    for root, dirs, files in os.walk(texturesPath):
-        for file in files:
-            relDir = os.path.relpath(root, texturesPath)
-            relFile = os.path.join(relDir, file) if relDir != '.' else file
-            relFile = relFile.replace("\\", "/")
-            if not file.endswith(".png"):
+    if "tints" in itemData:
+        tints = itemData["tints"]
+        if not isinstance(tints, list) or len(tints) == 0:
+            ctx.warn(f"Warning: Item file {itemFilePath} contains invalid tints value (should be a non-empty list), skipping.")
+            return
+        elif not case["model"]["type"] == "minecraft:model":
+            ctx.warn(f"Warning: Item file {itemFilePath} contains tints but its model type is not 'minecraft:model', skipping.")
+            return
+        else:
+            case["model"]["tints"] = tints
+
+    if "create_trims" in itemData:
+        trimType = itemData["create_trims"]
+        if trimType not in TRIM_TYPES:
+            ctx.warn(f"Warning: Item file {itemFilePath} contains invalid trimmable type {trimType} (must be one of {TRIM_TYPES}), skipping.")
+            return
+        elif case["model"]["type"] != "minecraft:model":
+            ctx.warn(f"Warning: Item file {itemFilePath} contains trimmable value but its model type is not 'minecraft:model', skipping.")
+            return
+
+        modelPath = case["model"]["model"]
+        model = get_model(ctx, modelPath)
+        if model is None:
+            ctx.warn(f"Warning: Item file {itemFilePath} trimmable model {modelPath} could not be found, skipping.")
+            return
+        elif "parent" not in model or model["parent"] != "item/generated":
+            ctx.warn(f"For automatic trims, item model {modelPath} must have parent 'item/generated', skipping.")
+            return
+
+        trimCases = []
+        case = {
+            "when": f"{itemKey}",
+            "model": {
+                "type": "minecraft:select",
+                "property": "trim_material",
+                "cases": trimCases,
+                "fallback": case["model"]
+            }
+        }
+
+        for trim in TRIMS:
+            trimModelPath = f"{modelPath}_trim_{trim}"
+            trimModel = copy.deepcopy(model)
+
+            particleLayer = None
+            if "particle" in trimModel["textures"]:
+                particleLayer = trimModel["textures"].pop("particle")
+            trimModel["textures"][f"layer{len(trimModel['textures'])}"] = f"trims/items/{trimType}_trim_{trim}"
+            if particleLayer is not None:
+                trimModel["textures"]["particle"] = particleLayer
+
+            save_model(ctx, trimModelPath, trimModel)
+            trimCases.append({
+                "when": trim,
+                "model": {
+                    "type": "minecraft:model",
+                    "model": trimModelPath
+                }
+            })
+
+    record_effect(ctx, ("item", case))
+
+def start_item_definition(ctx, vanillaItem, itemFilePath, hasFallback, fallback, oversized):
+    # an existing definition is changed in place, a new one is only added once the item's case is (see add_item_case)
+    vanillaDefinition = ctx.itemModelDefinitions[vanillaItem] if vanillaItem in ctx.itemModelDefinitions else new_vanilla_definition()
+    if hasFallback:
+        if "fallback" in vanillaDefinition:
+            ctx.warn(f"Warning: Item file {itemFilePath} contains a fallback but one is already defined for {vanillaItem}, overwriting fallback {vanillaDefinition['fallback']}.")
+        vanillaDefinition["fallback"] = fallback
+    if oversized:
+        vanillaDefinition["oversized_in_gui"] = True
+    ctx.itemDefinition = (vanillaItem, vanillaDefinition)
+
+def add_item_case(ctx, case):
+    vanillaItem, vanillaDefinition = ctx.itemDefinition
+    vanillaCases = vanillaDefinition["model"]["cases"] if "cases" in vanillaDefinition["model"] else []
+    vanillaCases.append(case)
+    vanillaDefinition["model"]["cases"] = vanillaCases
+    ctx.itemModelDefinitions[vanillaItem] = vanillaDefinition
+
+def write_item_definitions(ctx):
+    for itemPath, itemDef in ctx.itemModelDefinitions.items():
+        namespace, itemName = itemPath.split(':') if ':' in itemPath else ('minecraft', itemPath)
+        if "fallback" not in itemDef["model"]:
+            template = get_template(ctx, f"items/{itemName}")
+            if template is None:
+                template = {"model": {"type": "minecraft:model", "model": f"minecraft:item/{itemName}"} }
+            itemDef["model"]["fallback"] = template["model"]
+        save_item_definition(ctx, itemPath, itemDef)
+
+def copy_reachable_assets(ctx):
+    # partial builds: copy the models and textures reached by the compiled item model definitions
+    def add_asset(arcname):
+        if ctx.path_exists(os.path.join(ctx.tempDir, arcname)):
+            return True
+        namespace, relFile = arcname[len("assets/"):].split('/', 1)
+        if resolve_asset(ctx, namespace, relFile) is None:
+            return False
+        ctx.onlyCounts["assets"][0] += 1
+        copy_asset(ctx, namespace, relFile)
+        return True
+
+    modelPaths = []
+    collect_model_references(list(ctx.itemModelDefinitions.values()), modelPaths)
+    walk_model_closure(ctx, modelPaths, add_asset)
+
+def generate_atlases(ctx):
+    itemAtlasSources = []
+    blockAtlasSources = []
+    # find all textures under assets/<namespace>/textures/item and assets/<namespace>/textures/block
+    for namespace, assets in ctx.assets.items():
+        for relFile in [relFile[len("textures/"):] for relFile in assets if relFile.startswith("textures/")]:
+            if not relFile.endswith(".png"):
                 continue
+            if ctx.only is not None and not ctx.path_exists(os.path.join(ctx.tempDir, "assets", namespace, "textures", relFile)):
+                continue # not part of this partial build
             if relFile.startswith("item/"):
                 itemAtlasSources.append({
                     "type": "single",
@@ -788,42 +1491,228 @@ for namespace in os.listdir(os.path.join(INPUT_DIR, "assets")):
                     "resource": f"{namespace}:{relFile[:-4]}"
                 })
 
-save_asset("minecraft:atlases/items.json", {
-    "sources": itemAtlasSources
-})
-save_asset("minecraft:atlases/blocks.json", {
-    "sources": blockAtlasSources
-})
-
-# output logic:
-if os.path.exists(outputPath):
-    if logWarnings:
-        print(f"Warning: Output file {outputPath} already exists, overwriting.")
-    os.remove(outputPath)
-
-with zipfile.ZipFile(outputPath, 'w', zipfile.ZIP_DEFLATED) as zf:
-    for root, dirs, files in os.walk(tempDir):
-        for file in files:
-            filePath = os.path.join(root, file)
-            arcname = os.path.relpath(filePath, tempDir)
-            zf.write(filePath, arcname)
-
-print(f"Resource pack '{settings['name']}' version {settings['version']} generated at '{outputPath}'.")
-
-# clean up temp files
-if os.path.exists(tempDir) and deleteTemp:
-    for root, dirs, files in os.walk(tempDir, topdown=False):
-        for name in files:
-            os.remove(os.path.join(root, name))
-        for name in dirs:
-            os.rmdir(os.path.join(root, name))
-    os.rmdir(tempDir)
-
-# clean up template/items files (leave items.zip)
-if os.path.exists(os.path.join(TEMPLATE_DIR, "items")):
-    for root, dirs, files in os.walk(os.path.join(TEMPLATE_DIR, "items"), topdown=False):
-        for name in files:
-            if name != "items.zip":
+    save_asset(ctx, "minecraft:atlases/items.json", {
+        "sources": itemAtlasSources
+    })
+    save_asset(ctx, "minecraft:atlases/blocks.json", {
+        "sources": blockAtlasSources
+    })
+
+def collect_pack_entries(ctx, pack, tempFiles):
+    """Maps each zip entry of the pack to the temp file it is copied from, or the bytes it is written with."""
+    entries = {}
+    for arcname in tempFiles:
+        if pack["include"] is None or not arcname.startswith("assets/"):
+            entries[arcname] = os.path.join(ctx.tempDir, arcname)
+        elif arcname in ctx.assetSources and source_matches(ctx, pack["include"], ctx.assetSources[arcname]):
+            entries[arcname] = os.path.join(ctx.tempDir, arcname)
+    # every pack gets pack.mcmeta rendered with its own version
+    if ctx.packMeta is not None:
+        entries["pack.mcmeta"] = ctx.packMeta.replace("{version}", str(pack["version"])).encode('utf-8')
+    if pack["include"] is None:
+        return entries
+
+    # only keep the cases of included blockstate/item files in the vanilla item model definitions
+    modelPaths = []
+    for itemPath, itemDef in ctx.itemModelDefinitions.items():
+        caseSources = ctx.caseSources.get(itemPath, {})
+        cases = [case for case in itemDef["model"]["cases"] if case["when"] in caseSources and source_matches(ctx, pack["include"], caseSources[case["when"]])]
+        if not cases:
+            continue
+
+        namespace, itemName = itemPath.split(':') if ':' in itemPath else ('minecraft', itemPath)
+        packDef = copy.copy(itemDef)
+        packDef["model"] = copy.copy(itemDef["model"])
+        packDef["model"]["cases"] = cases
+        entries[f"assets/{namespace}/items/{itemName}.json"] = json.dumps(packDef, indent=None).encode('utf-8')
+        collect_model_references(packDef, modelPaths)
+
+    def add_asset(arcname):
+        if arcname not in tempFiles:
+            return False
+        entries[arcname] = os.path.join(ctx.tempDir, arcname)
+        return True
+    walk_model_closure(ctx, modelPaths, add_asset)
+
+    # and only append the textures the pack ends up with to the atlases
+    atlasSources = {"item": [], "block": []}
+    for arcname in entries:
+        parts = arcname.split('/', 4)
+        if len(parts) == 5 and parts[0] == "assets" and parts[2] == "textures" and parts[3] in atlasSources and arcname.endswith(".png"):
+            atlasSources[parts[3]].append({
+                "type": "single",
+                "resource": f"{parts[1]}:{parts[3]}/{parts[4][:-4]}"
+            })
+    entries["assets/minecraft/atlases/items.json"] = json.dumps({"sources": atlasSources["item"]}, indent=None).encode('utf-8')
+    entries["assets/minecraft/atlases/blocks.json"] = json.dumps({"sources": atlasSources["block"]}, indent=None).encode('utf-8')
+    return entries
+
+def write_pack_archive(outputPath, entries):
+    # runs on a worker thread, so counts are returned rather than recorded (only entries copied from disk are counted as read)
+    filesRead = 0
+    bytesRead = 0
+    with zipfile.ZipFile(outputPath, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for arcname, entry in entries.items():
+            if isinstance(entry, bytes):
+                zf.writestr(arcname, entry)
+                continue
+            zf.write(entry, arcname)
+            filesRead += 1
+            bytesRead += zf.getinfo(arcname).file_size
+    return filesRead, bytesRead, os.path.getsize(outputPath)
+
+def write_packs(ctx):
+    tempFiles = {arcname: None for arcname in ctx.list_files(ctx.tempDir)} # (ordered set)
+    writes = []
+    for pack in ctx.packs:
+        pack["outputPath"] = os.path.join(ctx.outputDir, f"{pack['name']}{ctx.outputSuffix}.zip")
+        pack["sourcesPath"] = os.path.join(ctx.outputDir, f"{pack['name']}{ctx.outputSuffix}.sources.json")
+        if ctx.path_exists(pack["outputPath"]):
+            ctx.warn(f"Warning: Output file {pack['outputPath']} already exists, overwriting.")
+            os.remove(pack["outputPath"])
+
+        entries = collect_pack_entries(ctx, pack, tempFiles)
+        writes.append((pack, entries))
+
+        ctx.write_json(pack["sourcesPath"], {
+            "assets": {arcname: source for arcname, source in ctx.assetSources.items() if arcname in entries},
+            "cases": ctx.caseSources
+        })
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(len(writes), 1)) as executor:
+        futures = [executor.submit(write_pack_archive, pack["outputPath"], entries) for pack, entries in writes]
+        for (pack, entries), future in zip(writes, futures):
+            filesRead, bytesRead, bytesWritten = future.result()
+            ctx.count("files_read", filesRead)
+            ctx.count("bytes_read", bytesRead)
+            ctx.count("files_written")
+            ctx.count("bytes_written", bytesWritten)
+            print(f"Resource pack '{pack['name']}' version {pack['version']} generated at '{pack['outputPath']}'.")
+
+def clean_temp_dir(ctx):
+    if ctx.path_exists(ctx.tempDir) and ctx.deleteTemp:
+        for root, dirs, files in ctx.walk(ctx.tempDir, topdown=False):
+            for name in files:
                 os.remove(os.path.join(root, name))
-        for name in dirs:
-            os.rmdir(os.path.join(root, name))
\ No newline at end of file
+            for name in dirs:
+                os.rmdir(os.path.join(root, name))
+        os.rmdir(ctx.tempDir)
+        ctx.cache.copied.pop(ctx.tempDir, None)
+
+## Build Entrypoint
+def build(inputDir=INPUT_DIR, outputDir=OUTPUT_DIR, settings=None, cache=None, templateDir=TEMPLATE_DIR, logWarnings=True, deleteTemp=False, profile=False, traceMemory=False, only=None):
+    """
+    Builds the pack(s) from inputDir into outputDir/<name>.zip and returns a BuildResult.
+    inputDir can also be a list of input layers, lowest precedence first (see index_inputs).
+    settings defaults to the topmost settings.json, pass a BuildCache to reuse parsed inputs and
+    compiled blockstate/item files between builds.
+    profile/traceMemory wrap the build in cProfile/tracemalloc and write their results next to the zip.
+    only makes a partial build of the blockstate/item files and assets matching the given namespaces/prefixes/globs
+    (plus the models and textures they reach), written as <name>.partial.zip.
+    Raises BuildError (before writing anything) if the build cannot run, e.g. when an input layer does not exist
+    or only matches nothing.
+    Warnings are always collected in BuildResult.warnings, logWarnings only controls whether they are printed.
+    """
+    if settings is None:
+        settings = load_settings(inputDir)
+    if cache is None:
+        cache = BuildCache()
+    ctx = BuildContext(inputDir, outputDir, settings, cache, templateDir, logWarnings, deleteTemp, only)
+
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if traceMemory:
+        import tracemalloc
+        tracemalloc.start()
+    buildStart = time.perf_counter()
+
+    # (the profiler and tracemalloc are always stopped, even if the build fails, as the caller's process may keep running)
+    try:
+        with ctx.phase("setup"):
+            index_inputs(ctx)
+            check_only_matches(ctx)
+            prepare_temp_dir(ctx)
+        with ctx.phase("copy"):
+            copy_assets(ctx)
+        with ctx.phase("blockstates"):
+            compile_blockstates(ctx)
+        with ctx.phase("items"):
+            merge_block_definitions(ctx)
+            compile_items(ctx)
+            write_item_definitions(ctx)
+        if only is not None:
+            with ctx.phase("resolve"):
+                copy_reachable_assets(ctx)
+        with ctx.phase("atlases"):
+            generate_atlases(ctx)
+        with ctx.phase("zip"):
+            write_packs(ctx)
+        with ctx.phase("cleanup"):
+            clean_temp_dir(ctx)
+
+        if traceMemory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if profile:
+            profiler.disable()
+        if traceMemory:
+            tracemalloc.stop()
+
+    if only is not None:
+        ctx.stats["only"] = {"patterns": only, **{kind: {"matched": matched, "total": total} for kind, (matched, total) in ctx.onlyCounts.items()}}
+        blockstates, items, assets = ctx.onlyCounts["blockstates"], ctx.onlyCounts["items"], ctx.onlyCounts["assets"]
+        print(f"Partial build: compiled {blockstates[0]}/{blockstates[1]} blockstates and {items[0]}/{items[1]} items, copied {assets[0]}/{assets[1]} assets (skipped {blockstates[1] - blockstates[0] + items[1] - items[0] + assets[1] - assets[0]} files).")
+
+    # write the build report (and profiling results if requested)
+    ctx.stats["name"] = ctx.name
+    ctx.stats["version"] = ctx.version
+    ctx.stats["wall_time"] = time.perf_counter() - buildStart
+
+    if profile:
+        profilePath = os.path.join(outputDir, f"{ctx.name}{ctx.outputSuffix}.prof")
+        profiler.dump_stats(profilePath)
+        ctx.stats["profile"] = profilePath
+        print(f"Profile written to '{profilePath}'. (View it with 'python -m pstats {profilePath}')")
+
+    if traceMemory:
+        memoryPath = os.path.join(outputDir, f"{ctx.name}{ctx.outputSuffix}.memory.txt")
+        with open(memoryPath, 'w', encoding='utf-8') as f:
+            f.write(f"Peak traced memory: {peak} bytes\n")
+            f.write(f"Traced memory at end of build: {current} bytes\n\n")
+            for stat in snapshot.statistics("lineno")[:25]:
+                f.write(f"{stat}\n")
+        ctx.stats["memory"] = {
+            "peak_bytes": peak,
+            "current_bytes": current,
+            "report": memoryPath
+        }
+        print(f"Memory trace written to '{memoryPath}'.")
+
+    with open(ctx.reportPath, 'w', encoding='utf-8') as f:
+        json.dump(ctx.stats, f, indent=4)
+    print(f"Build report written to '{ctx.reportPath}'.")
+
+    packs = [{key: pack[key] for key in ["name", "version", "outputPath", "sourcesPath"]} for pack in ctx.packs]
+    return BuildResult(ctx.name, ctx.version, packs, ctx.reportPath, ctx.stats, ctx.warnings)
+
+def main(argv=None):
+    argParser = argparse.ArgumentParser(description="Generates the resource pack from the 'input' directory.")
+    argParser.add_argument("--input", action="append", metavar="DIR", help=f"an input directory (default '{INPUT_DIR}'), can be repeated to layer overlays on top of it, later ones take precedence")
+    argParser.add_argument("--output", default=OUTPUT_DIR, help=f"the output directory (default '{OUTPUT_DIR}')")
+    argParser.add_argument("--only", action="append", metavar="PATTERN", help="only build the blockstates, items and assets matching this namespace, '<namespace>/<path>' prefix or glob (plus what they reach) into <name>.partial.zip, can be repeated")
+    argParser.add_argument("--profile", action="store_true", help="run the build under cProfile and write the stats next to the output zip")
+    argParser.add_argument("--trace-memory", action="store_true", help="run the build under tracemalloc and write the top allocation sites next to the output zip")
+    args = argParser.parse_args(argv)
+
+    try:
+        build(args.input if args.input is not None else INPUT_DIR, args.output, profile=args.profile, traceMemory=args.trace_memory, only=args.only)
+    except BuildError as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())